@@ -10,26 +10,55 @@ Example:
 from __future__ import annotations
 
 import argparse
+import os
 import re
 import sqlite3
+import string
 from collections import defaultdict
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Callable, Collection, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar, Union
 
 from openpyxl import load_workbook
 
-
-DATE_FORMATS = [
-    "%Y-%m-%d %H:%M:%S",
-    "%Y-%m-%d",
-    "%d/%m/%Y",
-    "%d/%m/%y",
-    "%d-%m-%Y",
-    "%d-%m-%y",
-    "%d.%m.%Y",
-    "%d.%m.%y",
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover - optional dependency
+    CalamineWorkbook = None
+
+
+# Numeric layouts ("%Y-%m-%d[ %H:%M:%S]" and "%d/%m/%Y"-style with /, - or .) are matched
+# in one pass; only the month-name layouts still go through strptime.
+NUMERIC_LAYOUT_RE = re.compile(
+    r"(?P<iso_y>\d{4})-(?P<iso_m>\d{1,2})-(?P<iso_d>\d{1,2})"
+    r"(?:(?:\s+|T)(?P<hour>\d{1,2}):(?P<minute>\d{1,2}):(?P<second>\d{1,2}))?"
+    r"|(?P<day>\d{1,2})(?P<sep>[/.\-])(?P<month>\d{1,2})(?P=sep)(?P<year>\d{4}|\d{2})"
+)
+
+SECTION_MARKERS = (
+    "PRODUCTION",
+    "PHOTOS",
+    "PERSONNEL",
+    "PLANT",
+    "DELAYS-OPPORTUNITY",
+    "HSEQ",
+    "INCIDENTS",
+    "COMMUNICATIONS",
+    "QTY",
+    "COMMENTS",
+)
+
+_SECTION_PENDING, _SECTION_OPEN, _SECTION_DONE = range(3)
+
+HAS_DIGIT_RE = re.compile(r"\d")
+HAS_LETTER_RE = re.compile(r"[^\W\d_]")
+
+TEXT_DATE_FORMATS = [
     "%d %B %Y",
     "%d %b %Y",
     "%B %d %Y",
@@ -38,6 +67,102 @@ DATE_FORMATS = [
 
 NUMERIC_DATE_RE = re.compile(r"(?<!\d)(\d{1,2})[\\/.\-](\d{1,2})[\\/.\-](\d{2,4})(?!\d)")
 
+LABOUR_STOP_RE = re.compile(
+    "PLANT NOT|PLANNED WORKS|INCIDENTS|COMMUNICATIONS|DAILY WORK EXTENSION|DAILY WORK PHOTOS"
+)
+
+# float() also reads "inf", "infinity" and "nan" in any case, so only the other ASCII letters
+# rule a number out; signs, digits (including non-ASCII ones) and punctuation still go to float().
+NON_NUMBER_START_CHARS = frozenset(string.ascii_letters) - frozenset("iInN")
+
+NON_NAME_VALUES = frozenset({"", "name", "contact"})
+SQL_MAX_VARIABLES = 999
+SQL_STATEMENT_CACHE = 512
+PARSE_CHUNKSIZE = 4
+
+T = TypeVar("T")
+
+ACTIVITY_COLUMNS = ("diary_date", "activity", "source_file", "worksheet")
+PERSONNEL_COLUMNS = ("diary_date", "team_type", "name", "position", "hours", "source_file", "worksheet")
+DELAY_ISSUE_COLUMNS = (
+    "diary_date",
+    "entry_type",
+    "label",
+    "description",
+    "qty",
+    "comments",
+    "source_file",
+    "worksheet",
+)
+SUPERVISOR_COMMENT_COLUMNS = (
+    "diary_date",
+    "worker_or_group",
+    "hours",
+    "machine",
+    "start_smu",
+    "end_smu",
+    "machine_hours",
+    "location",
+    "activity",
+    "material",
+    "comment",
+    "source_file",
+    "worksheet",
+)
+EXTENSION_NOTE_COLUMNS = ("diary_date", "note", "source_file", "worksheet")
+FALLBACK_ACTIVITY_COLUMNS = ("diary_date", "activity", "source_file", "worksheet")
+
+DIARY_TABLES = (
+    "activities",
+    "personnel",
+    "delays_issues",
+    "supervisor_comments",
+    "supervisor_extension_notes",
+    "client_fallback_activities",
+)
+
+UNIQUE_INDEXES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "activities": ("ux_activities", ("diary_date", "activity")),
+    "personnel": ("ux_personnel", ("diary_date", "team_type", "name")),
+    "delays_issues": (
+        "ux_delays_issues",
+        ("diary_date", "entry_type", "label", "description", "qty", "comments"),
+    ),
+    "supervisor_comments": (
+        "ux_supervisor_comments",
+        ("diary_date", "worker_or_group", "comment", "source_file", "worksheet"),
+    ),
+    "supervisor_extension_notes": (
+        "ux_supervisor_extension_notes",
+        ("diary_date", "note", "source_file", "worksheet"),
+    ),
+    "client_fallback_activities": (
+        "ux_client_fallback_activities",
+        ("diary_date", "activity", "source_file", "worksheet"),
+    ),
+}
+
+# Cover the per-day ORDER BY of generate_daily_report where the unique index does not already.
+REPORT_INDEXES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "activities": ("ix_activities_report", ("diary_date", "source_file", "worksheet", "activity")),
+    "supervisor_extension_notes": ("ix_supervisor_extension_notes_report", ("diary_date", "source_file", "worksheet")),
+    "client_fallback_activities": (
+        "ix_client_fallback_activities_report",
+        ("diary_date", "source_file", "worksheet", "activity"),
+    ),
+}
+
+# Bulk-ingest tuning. WAL + synchronous=NORMAL avoids an fsync per commit while staying
+# crash-safe; exclusive locking is deliberately not used so readers (reports, audits,
+# tests) can open the database while a DiaryDatabase connection is still alive.
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA mmap_size = 268435456",
+)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Create SQLite database from diary Excel files.")
@@ -92,12 +217,13 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-@dataclass
+@dataclass(slots=True)
 class SheetRow:
     raw: Tuple[Optional[object], ...]
     text: Tuple[str, ...]
     joined: str
     upper: str
+    markers: FrozenSet[str]
 
 
 @dataclass
@@ -111,6 +237,15 @@ class ClientSheetData:
     incidents: List[Tuple[str, str, float, str]]
 
 
+@dataclass
+class ClientSheetSections:
+    diary_date: Optional[date]
+    activities: List[str]
+    personnel: List[Tuple[str, str, str, float]]
+    delays: List[Tuple[str, str, float, str]]
+    incidents: List[Tuple[str, str, float, str]]
+
+
 @dataclass
 class SupervisorCommentRecord:
     diary_date: date
@@ -146,11 +281,21 @@ class FallbackActivity:
 
 
 class DiaryDatabase:
-    def __init__(self, path: Path, reset: bool = False) -> None:
-        if reset and path.exists():
-            path.unlink()
-        self.conn = sqlite3.connect(path)
+    def __init__(self, path: Union[Path, str], reset: bool = False) -> None:
+        # path may also be a "file:" URI, e.g. a shared-cache in-memory database in tests.
+        if reset and not _is_sqlite_uri(path):
+            # Remove the WAL and shared-memory files too, or SQLite may replay a stale WAL
+            # onto the new empty database.
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{path}{suffix}").unlink(missing_ok=True)
+        self._deferred_keys: Dict[str, Set[Tuple[object, ...]]] = {}
+        # Autocommit mode: ingest transactions are opened explicitly through transaction().
+        self.conn = sqlite3.connect(
+            path, isolation_level=None, cached_statements=SQL_STATEMENT_CACHE, uri=_is_sqlite_uri(path)
+        )
         self.conn.execute("PRAGMA foreign_keys = ON")
+        for pragma in INGEST_PRAGMAS:
+            self.conn.execute(pragma)
         self._create_schema()
 
     def _create_schema(self) -> None:
@@ -161,8 +306,7 @@ class DiaryDatabase:
                 diary_date TEXT NOT NULL,
                 activity TEXT NOT NULL,
                 source_file TEXT NOT NULL,
-                worksheet TEXT NOT NULL,
-                UNIQUE(diary_date, activity)
+                worksheet TEXT NOT NULL
             );
 
             CREATE TABLE IF NOT EXISTS personnel (
@@ -173,8 +317,7 @@ class DiaryDatabase:
                 position TEXT NOT NULL,
                 hours REAL NOT NULL,
                 source_file TEXT NOT NULL,
-                worksheet TEXT NOT NULL,
-                UNIQUE(diary_date, team_type, name)
+                worksheet TEXT NOT NULL
             );
 
             CREATE TABLE IF NOT EXISTS delays_issues (
@@ -186,8 +329,7 @@ class DiaryDatabase:
                 qty REAL NOT NULL,
                 comments TEXT NOT NULL,
                 source_file TEXT NOT NULL,
-                worksheet TEXT NOT NULL,
-                UNIQUE(diary_date, entry_type, label, description, qty, comments)
+                worksheet TEXT NOT NULL
             );
 
             CREATE TABLE IF NOT EXISTS supervisor_comments (
@@ -208,8 +350,7 @@ class DiaryDatabase:
                 audit_status TEXT,
                 audit_model TEXT,
                 audit_timestamp TEXT,
-                audit_notes TEXT,
-                UNIQUE(diary_date, worker_or_group, comment, source_file, worksheet)
+                audit_notes TEXT
             );
 
             CREATE TABLE IF NOT EXISTS supervisor_extension_notes (
@@ -217,8 +358,7 @@ class DiaryDatabase:
                 diary_date TEXT NOT NULL,
                 note TEXT NOT NULL,
                 source_file TEXT NOT NULL,
-                worksheet TEXT NOT NULL,
-                UNIQUE(diary_date, note, source_file, worksheet)
+                worksheet TEXT NOT NULL
             );
 
             CREATE TABLE IF NOT EXISTS client_fallback_activities (
@@ -226,12 +366,12 @@ class DiaryDatabase:
                 diary_date TEXT NOT NULL,
                 activity TEXT NOT NULL,
                 source_file TEXT NOT NULL,
-                worksheet TEXT NOT NULL,
-                UNIQUE(diary_date, activity, source_file, worksheet)
+                worksheet TEXT NOT NULL
             );
             """
         )
         self._ensure_audit_columns()
+        self.create_indexes()
 
     def _ensure_audit_columns(self) -> None:
         self._ensure_column("supervisor_comments", "audit_status", "TEXT")
@@ -241,33 +381,102 @@ class DiaryDatabase:
 
     def _ensure_column(self, table: str, column: str, definition: str) -> None:
         cur = self.conn.execute(f"PRAGMA table_info({table})")
-        columns = {row[1] for row in cur.fetchall()}
+        columns = {row[1] for row in cur}
         if column not in columns:
             self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
+    def create_indexes(self) -> None:
+        for table, (index, columns) in UNIQUE_INDEXES.items():
+            if self._has_unique_constraint(table):
+                continue
+            try:
+                self.conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table} ({', '.join(columns)})")
+            except sqlite3.IntegrityError as exc:
+                raise RuntimeError(f"Ingestion validation failed:\n- duplicate rows in {table}: {exc}") from exc
+        for table, (index, columns) in REPORT_INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({', '.join(columns)})")
+
+    def drop_indexes(self) -> None:
+        # Only empty tables are loaded without their unique index; bulk_insert then applies the
+        # INSERT OR IGNORE semantics itself by tracking the unique keys it has written.
+        for table, (index, _) in UNIQUE_INDEXES.items():
+            if self._has_unique_constraint(table):
+                continue
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None:
+                continue
+            self.conn.execute(f"DROP INDEX IF EXISTS {index}")
+            if table in REPORT_INDEXES:
+                self.conn.execute(f"DROP INDEX IF EXISTS {REPORT_INDEXES[table][0]}")
+            self._deferred_keys[table] = set()
+
+    @contextmanager
+    def transaction(self) -> Iterator["DiaryDatabase"]:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    @contextmanager
+    def bulk_load(self) -> Iterator["DiaryDatabase"]:
+        # Always inside a transaction: on failure the rollback restores the dropped unique
+        # indexes (and discards the rows), so every other insert path keeps its constraints.
+        with nullcontext() if self.conn.in_transaction else self.transaction():
+            self.drop_indexes()
+            try:
+                yield self
+            finally:
+                self._deferred_keys.clear()
+            self.create_indexes()
+
+    def _has_unique_constraint(self, table: str) -> bool:
+        # Databases created before the unique indexes were split out keep inline UNIQUE
+        # constraints, which SQLite cannot drop.
+        return any(row[3] == "u" for row in self.conn.execute(f"PRAGMA index_list({table})"))
+
+    def _unseen_rows(
+        self, table: str, columns: Sequence[str], rows: Iterable[Tuple[object, ...]]
+    ) -> Iterator[Tuple[object, ...]]:
+        seen = self._deferred_keys[table]
+        positions = [columns.index(column) for column in UNIQUE_INDEXES[table][1]]
+        for row in rows:
+            key = tuple(row[position] for position in positions)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield row
+
+    def bulk_insert(self, table: str, columns: Sequence[str], rows: Iterable[Tuple[object, ...]]) -> int:
+        if table in self._deferred_keys:
+            rows = self._unseen_rows(table, columns, rows)
+        # Full chunks go in as one multi-row INSERT (bound parameters stay under SQLite's
+        # historical 999 limit); the remainder goes through executemany.
+        columns = tuple(columns)
+        rows_per_statement = max(1, SQL_MAX_VARIABLES // len(columns))
+        chunk_sql = _insert_sql(table, columns, rows_per_statement)
+        before = self.conn.total_changes
+        iterator = iter(rows)
+        while True:
+            batch = list(islice(iterator, rows_per_statement))
+            if len(batch) < rows_per_statement:
+                if batch:
+                    self.conn.executemany(_insert_sql(table, columns), batch)
+                break
+            self.conn.execute(chunk_sql, list(chain.from_iterable(batch)))
+        return self.conn.total_changes - before
+
     def insert_activity(self, diary_date: str, activity: str, source_file: str, worksheet: str) -> bool:
         if not activity:
             return False
-        cur = self.conn.execute(
-            """
-            INSERT OR IGNORE INTO activities (diary_date, activity, source_file, worksheet)
-            VALUES (?, ?, ?, ?)
-            """,
-            (diary_date, activity, source_file, worksheet),
-        )
-        return cur.rowcount > 0
+        return self.bulk_insert("activities", ACTIVITY_COLUMNS, [(diary_date, activity, source_file, worksheet)]) > 0
 
     def insert_person(self, diary_date: str, team: str, name: str, position: str, hours: float, source_file: str, worksheet: str) -> bool:
         if not name:
             return False
-        cur = self.conn.execute(
-            """
-            INSERT OR IGNORE INTO personnel (diary_date, team_type, name, position, hours, source_file, worksheet)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (diary_date, team, name.strip(), position or "", float(hours or 0), source_file, worksheet),
-        )
-        return cur.rowcount > 0
+        row = _person_row(diary_date, team, name, position, hours, source_file, worksheet)
+        return self.bulk_insert("personnel", PERSONNEL_COLUMNS, [row]) > 0
 
     def insert_delay_issue(
         self,
@@ -280,103 +489,177 @@ class DiaryDatabase:
         source_file: str,
         worksheet: str,
     ) -> bool:
-        cur = self.conn.execute(
-            """
-            INSERT OR IGNORE INTO delays_issues
-                (diary_date, entry_type, label, description, qty, comments, source_file, worksheet)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (diary_date, entry_type, label, description, float(qty or 0), comments, source_file, worksheet),
-        )
-        return cur.rowcount > 0
+        row = _delay_issue_row(diary_date, entry_type, label, description, qty, comments, source_file, worksheet)
+        return self.bulk_insert("delays_issues", DELAY_ISSUE_COLUMNS, [row]) > 0
 
     def insert_supervisor_comment(self, record: SupervisorCommentRecord) -> bool:
-        cur = self.conn.execute(
-            """
-            INSERT OR IGNORE INTO supervisor_comments
-                (diary_date, worker_or_group, hours, machine, start_smu, end_smu, machine_hours, location, activity, material, comment, source_file, worksheet)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                record.diary_date.isoformat(),
-                record.label,
-                record.hours,
-                record.machine,
-                record.start_smu,
-                record.end_smu,
-                record.machine_hours,
-                record.location,
-                record.activity,
-                record.material,
-                record.comment,
-                record.source_file,
-                record.worksheet,
-            ),
-        )
-        return cur.rowcount > 0
+        return self.bulk_insert("supervisor_comments", SUPERVISOR_COMMENT_COLUMNS, [_supervisor_comment_row(record)]) > 0
 
     def insert_extension_note(self, record: SupervisorSheetData, note: str) -> bool:
-        cur = self.conn.execute(
-            """
-            INSERT OR IGNORE INTO supervisor_extension_notes
-                (diary_date, note, source_file, worksheet)
-            VALUES (?, ?, ?, ?)
-            """,
-            (record.diary_date.isoformat(), note, record.source_file, record.worksheet),
-        )
-        return cur.rowcount > 0
+        row = (record.diary_date.isoformat(), note, record.source_file, record.worksheet)
+        return self.bulk_insert("supervisor_extension_notes", EXTENSION_NOTE_COLUMNS, [row]) > 0
 
     def insert_fallback_activity(self, entry: FallbackActivity) -> bool:
-        cur = self.conn.execute(
-            """
-            INSERT OR IGNORE INTO client_fallback_activities
-                (diary_date, activity, source_file, worksheet)
-            VALUES (?, ?, ?, ?)
-            """,
-            (entry.diary_date.isoformat(), entry.text, entry.source_file, entry.worksheet),
-        )
-        return cur.rowcount > 0
+        return self.bulk_insert("client_fallback_activities", FALLBACK_ACTIVITY_COLUMNS, [_fallback_row(entry)]) > 0
 
-    def delete_dates(self, diary_dates: Set[str]) -> None:
+    def delete_dates(self, diary_dates: Collection[str]) -> None:
         if not diary_dates:
             return
-        placeholders = ",".join("?" for _ in diary_dates)
-        for table in [
-            "activities",
-            "personnel",
-            "delays_issues",
-            "supervisor_comments",
-            "supervisor_extension_notes",
-            "client_fallback_activities",
-        ]:
+        # Materialise the dates once instead of binding an IN (...) list per table.
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS target_dates (diary_date TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM temp.target_dates")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO temp.target_dates (diary_date) VALUES (?)",
+            ((diary_date,) for diary_date in diary_dates),
+        )
+        for table in DIARY_TABLES:
             self.conn.execute(
-                f"DELETE FROM {table} WHERE diary_date IN ({placeholders})",
-                tuple(sorted(diary_dates)),
+                f"DELETE FROM {table} WHERE diary_date IN (SELECT diary_date FROM temp.target_dates)"
             )
+        self.conn.execute("DROP TABLE temp.target_dates")
 
     def commit(self) -> None:
         self.conn.commit()
 
+    def close(self) -> None:
+        self.conn.close()
+
+
+@lru_cache(maxsize=None)
+def _insert_sql(table: str, columns: Tuple[str, ...], row_count: int = 1) -> str:
+    values = ", ".join([f"({', '.join('?' for _ in columns)})"] * row_count)
+    return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES {values}"
+
+
+def _person_row(
+    diary_date: str, team: str, name: str, position: str, hours: float, source_file: str, worksheet: str
+) -> Tuple[object, ...]:
+    return (diary_date, team, name.strip(), position or "", float(hours or 0), source_file, worksheet)
+
+
+def _delay_issue_row(
+    diary_date: str,
+    entry_type: str,
+    label: str,
+    description: str,
+    qty: float,
+    comments: str,
+    source_file: str,
+    worksheet: str,
+) -> Tuple[object, ...]:
+    return (diary_date, entry_type, label, description, float(qty or 0), comments, source_file, worksheet)
+
+
+def _supervisor_comment_row(record: SupervisorCommentRecord) -> Tuple[object, ...]:
+    return (
+        record.diary_date.isoformat(),
+        record.label,
+        record.hours,
+        record.machine,
+        record.start_smu,
+        record.end_smu,
+        record.machine_hours,
+        record.location,
+        record.activity,
+        record.material,
+        record.comment,
+        record.source_file,
+        record.worksheet,
+    )
+
+
+def _fallback_row(entry: FallbackActivity) -> Tuple[object, ...]:
+    return (entry.diary_date.isoformat(), entry.text, entry.source_file, entry.worksheet)
+
 
 def iter_excel_files(directory: Path) -> List[Path]:
+    # os.scandir walk instead of rglob: no per-entry Path objects or fnmatch. Like rglob it
+    # does not descend into symlinked directories and skips unreadable ones.
     files: List[Path] = []
-    for file_path in sorted(directory.rglob("*.xlsx")):
-        if file_path.name.startswith("~$"):
+    pending = [str(directory)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif name.endswith(".xlsx") and not name.startswith("~$"):
+                        files.append(Path(entry.path))
+        except OSError:
             continue
-        files.append(file_path)
+    files.sort()
     return files
 
 
+def read_workbook_sheets(file_path: Path) -> List[Tuple[str, List[Tuple[Optional[object], ...]]]]:
+    # Rows are read in full so the workbook (and its file handle) is closed before returning.
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(str(file_path))
+        try:
+            return [(name, list(_iter_calamine_rows(workbook, name))) for name in workbook.sheet_names]
+        finally:
+            workbook.close()
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [(name, list(workbook[name].iter_rows(values_only=True))) for name in workbook.sheetnames]
+    finally:
+        workbook.close()
+
+
+def _iter_calamine_rows(workbook, sheet_name: str) -> Iterable[Tuple[Optional[object], ...]]:
+    # Match openpyxl's values_only output: blanks are None, whole numbers are ints (below 1e16,
+    # where Excel and openpyxl write them without an exponent) and date cells are datetimes.
+    # skip_empty_area stays off so column indexes line up with the sheet, and formula cells
+    # without a cached value read as None in both backends. Two differences remain:
+    # python-calamine reports error cells (#N/A, #REF!) as blanks where openpyxl returns the
+    # error text, and rows end at the last cell with a value rather than at the sheet's
+    # <dimension>, so openpyxl may add trailing None cells and empty rows.
+    for row in workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False):
+        yield tuple(
+            None
+            if value == ""
+            else int(value)
+            if type(value) is float and value.is_integer() and -1e16 < value < 1e16
+            else datetime(value.year, value.month, value.day)
+            if type(value) is date
+            else value
+            for value in row
+        )
+
+
 def iter_sheet_rows(ws) -> Iterable[SheetRow]:
-    for row in ws.iter_rows(values_only=True):
+    return iter_value_rows(ws.iter_rows(values_only=True))
+
+
+def iter_value_rows(values: Iterable[Sequence[Optional[object]]]) -> Iterable[SheetRow]:
+    formatter_for = _CELL_FORMATTERS.get
+    for row in values:
         raw = tuple(row)
-        text = tuple(_format_cell(value) for value in raw)
+        text = tuple(["" if value is None else formatter_for(type(value), _format_cell)(value) for value in raw])
         if not any(text):
             continue
         joined = " ".join(value.strip() for value in text if value)
         if not joined:
             continue
-        yield SheetRow(raw=raw, text=text, joined=joined, upper=joined.upper())
+        upper = joined.upper()
+        yield SheetRow(
+            raw=raw,
+            text=text,
+            joined=joined,
+            upper=upper,
+            markers=frozenset(marker for marker in SECTION_MARKERS if marker in upper),
+        )
+
+
+# Exact-type fast paths for the per-cell formatting in iter_value_rows. Only C-level callables
+# are listed; datetimes, subclasses and anything else go through _format_cell.
+_CELL_FORMATTERS: Dict[type, Callable[[object], str]] = {
+    str: str.strip,
+    int: str,
+    float: str,
+    date: date.isoformat,
+}
 
 
 def _format_cell(value: Optional[object]) -> str:
@@ -391,10 +674,10 @@ def _format_cell(value: Optional[object]) -> str:
     return str(value).strip()
 
 
-def _row_text(worksheet, row_index: int) -> str:
+def _row_text(row: Sequence[Optional[object]]) -> str:
     values: List[str] = []
-    for cell in worksheet[row_index]:
-        text = _format_cell(cell.value)
+    for value in row:
+        text = _format_cell(value)
         if text:
             values.append(text)
     return " | ".join(values)
@@ -405,17 +688,54 @@ def _text(value: Optional[object]) -> str:
         return ""
     if isinstance(value, (datetime, date)):
         return value.isoformat()
-    return re.sub(r"\s+", " ", str(value).replace("\xa0", " ")).strip()
+    return " ".join(str(value).split())
 
 
-def extract_diary_date(rows: Sequence[SheetRow]) -> Optional[date]:
+def extract_diary_date(rows: Iterable[SheetRow]) -> Optional[date]:
+    # Single pass so callers can stream rows: returns on the first parseable cell.
+    scan = _DiaryDateScan()
     for row in rows:
-        for value in row.raw:
-            parsed = _parse_date_value(value)
-            if parsed:
-                return parsed
-    blob = " ".join(row.joined for row in rows)
-    return _parse_date_from_string(blob)
+        parsed = scan.add(row)
+        if parsed:
+            return parsed
+    return scan.fallback()
+
+
+@dataclass
+class _DiaryDateScan:
+    # The diary date search shared by extract_diary_date and parse_client_rows: the first
+    # parseable cell wins, otherwise fallback() parses the text of the rows seen so far.
+    joined_rows: List[str] = field(default_factory=list)
+    numeric_match: Optional[re.Match] = None
+
+    def add(self, row: SheetRow) -> Optional[date]:
+        parsed = _row_date(row)
+        if parsed is None:
+            self.joined_rows.append(row.joined)
+            if self.numeric_match is None:
+                self.numeric_match = NUMERIC_DATE_RE.search(row.joined)
+        return parsed
+
+    def fallback(self) -> Optional[date]:
+        # Same result as parsing the whole sheet joined with spaces. Numeric matches cannot
+        # span rows, so the first one found row by row wins; otherwise the joined text still
+        # goes through the full string parser, which finds textual-month dates split across rows.
+        if not self.joined_rows:
+            return None
+        if len(self.joined_rows) == 1:
+            return _parse_date_from_string(self.joined_rows[0])
+        if self.numeric_match:
+            return _date_from_numeric_match(self.numeric_match)
+        # Uncached: a one-off sheet-sized string would only push cell values out of the cache.
+        return _parse_date_from_string.__wrapped__(" ".join(self.joined_rows))
+
+
+def _row_date(row: SheetRow) -> Optional[date]:
+    for value in row.raw:
+        parsed = _parse_date_value(value)
+        if parsed:
+            return parsed
+    return None
 
 
 def _parse_date_value(value: Optional[object]) -> Optional[date]:
@@ -430,79 +750,161 @@ def _parse_date_value(value: Optional[object]) -> Optional[date]:
     return None
 
 
+@lru_cache(maxsize=1 << 15)
 def _parse_date_from_string(value: str) -> Optional[date]:
     cleaned = value.strip()
-    if not cleaned:
+    # Every supported layout needs digits, so most non-date text is rejected here.
+    if not cleaned or not HAS_DIGIT_RE.search(cleaned):
         return None
-    for fmt in DATE_FORMATS:
-        try:
-            return datetime.strptime(cleaned, fmt).date()
-        except ValueError:
-            continue
-    if re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}", cleaned):
-        try:
-            return datetime.fromisoformat(cleaned).date()
-        except ValueError:
-            pass
+    parsed = _parse_numeric_layout(cleaned)
+    if parsed:
+        return parsed
+    if HAS_LETTER_RE.search(cleaned):
+        for fmt in TEXT_DATE_FORMATS:
+            try:
+                return datetime.strptime(cleaned, fmt).date()
+            except ValueError:
+                continue
     match = NUMERIC_DATE_RE.search(cleaned)
     if match:
-        day, month, year = match.groups()
-        year_value = int(year)
-        if year_value < 100:
-            year_value += 2000
-        return date(year_value, int(month), int(day))
+        return _date_from_numeric_match(match)
     return None
 
 
-def extract_activities(rows: Sequence[SheetRow]) -> List[str]:
-    activities: List[str] = []
-    in_section = False
-    for row in rows:
-        if not in_section:
-            if "PRODUCTION" in row.upper:
-                in_section = True
-            continue
-        if "PHOTOS" in row.upper:
-            break
-        text = row.joined.strip()
-        if not text or "COMMUNICATIONS" in row.upper or "PRODUCTION" in row.upper:
-            continue
-        activities.append(text)
-    return activities
+def _date_from_numeric_match(match: re.Match) -> date:
+    day, month, year = match.groups()
+    year_value = int(year)
+    if year_value < 100:
+        year_value += 2000
+    return date(year_value, int(month), int(day))
 
 
-def extract_personnel(rows: Sequence[SheetRow]) -> List[Tuple[str, str, str, float]]:
+def _parse_numeric_layout(value: str) -> Optional[date]:
+    match = NUMERIC_LAYOUT_RE.fullmatch(value)
+    if not match:
+        return None
+    groups = match.groupdict()
+    try:
+        if groups["iso_y"]:
+            if groups["hour"] and (
+                int(groups["hour"]) > 23 or int(groups["minute"]) > 59 or int(groups["second"]) > 61
+            ):
+                return None
+            return date(int(groups["iso_y"]), int(groups["iso_m"]), int(groups["iso_d"]))
+        year = int(groups["year"])
+        if len(groups["year"]) == 2:
+            year += 2000 if year < 69 else 1900
+        return date(year, int(groups["month"]), int(groups["day"]))
+    except ValueError:
+        return None
+
+
+def parse_client_rows(rows: Iterable[SheetRow]) -> ClientSheetSections:
+    # One walk over the (possibly streamed) sheet. Every section tracks its own state
+    # (pending -> open -> done) so overlapping or out-of-order sections behave as if each were scanned separately.
+    sections = ClientSheetSections(diary_date=None, activities=[], personnel=[], delays=[], incidents=[])
+    production = personnel = delays = incidents = _SECTION_PENDING
+    personnel_groups: Optional[List[Tuple[int, str]]] = None
+    personnel_header_seen = False
+    incidents_header_skipped = False
+    date_scan = _DiaryDateScan()
+    for row in rows:
+        markers = row.markers
+        if sections.diary_date is None:
+            sections.diary_date = date_scan.add(row)
+
+        if production == _SECTION_PENDING:
+            if "PRODUCTION" in markers:
+                production = _SECTION_OPEN
+        elif production == _SECTION_OPEN:
+            if "PHOTOS" in markers:
+                production = _SECTION_DONE
+            else:
+                text = row.joined.strip()
+                if text and "COMMUNICATIONS" not in markers and "PRODUCTION" not in markers:
+                    sections.activities.append(text)
+
+        if personnel == _SECTION_PENDING:
+            if "PERSONNEL" in markers:
+                personnel = _SECTION_OPEN
+        elif personnel == _SECTION_OPEN:
+            if "PLANT" in markers:
+                personnel = _SECTION_DONE
+            elif personnel_groups is None:
+                personnel_groups = _group_columns(row)
+            elif not personnel_header_seen and _is_personnel_header(row):
+                personnel_header_seen = True
+            elif any(row.text) and not any(cell.lower().startswith("total") for cell in row.text if cell):
+                sections.personnel.extend(_personnel_from_row(row, personnel_groups))
+
+        if delays == _SECTION_PENDING:
+            if "DELAYS-OPPORTUNITY" in markers:
+                delays = _SECTION_OPEN
+        elif delays == _SECTION_OPEN:
+            if "HSEQ" in markers:
+                delays = _SECTION_DONE
+            else:
+                text = row.joined.strip()
+                if text:
+                    sections.delays.extend(("delay", chunk, 0.0, "") for chunk in _split_multiline(text))
+
+        if incidents == _SECTION_PENDING:
+            if "INCIDENTS" in markers:
+                incidents = _SECTION_OPEN
+        elif incidents == _SECTION_OPEN:
+            if not incidents_header_skipped and ("QTY" in markers or "COMMENTS" in markers):
+                incidents_header_skipped = True
+            elif "COMMUNICATIONS" in markers or "PRODUCTION" in markers:
+                incidents = _SECTION_DONE
+            else:
+                entry = _incident_from_row(row)
+                if entry:
+                    sections.incidents.append(entry)
+
+    if sections.diary_date is None:
+        sections.diary_date = date_scan.fallback()
+    return sections
+
+
+def _is_personnel_header(row: SheetRow) -> bool:
+    lower_values = [val.lower() for val in row.text if val]
+    return "name" in lower_values and "position" in lower_values
+
+
+def _personnel_from_row(row: SheetRow, groups: List[Tuple[int, str]]) -> List[Tuple[str, str, str, float]]:
     people: List[Tuple[str, str, str, float]] = []
-    start_idx = next((idx for idx, row in enumerate(rows) if "PERSONNEL" in row.upper), None)
-    if start_idx is None:
-        return people
-    group_row: Optional[SheetRow] = None
-    header_seen = False
-    for row in rows[start_idx + 1 :]:
-        if "PLANT" in row.upper:
-            break
-        if group_row is None:
-            group_row = row
-            continue
-        if not header_seen:
-            lower_values = [val.lower() for val in row.text if val]
-            if "name" in lower_values and "position" in lower_values:
-                header_seen = True
-                continue
-        if not any(row.text):
+    for col, team in groups:
+        name = _safe_get(row.raw, col)
+        if not _is_valid_name(name):
             continue
-        if any(cell.lower().startswith("total") for cell in row.text if cell):
-            continue
-        for col, team in _group_columns(group_row):
-            name = _safe_get(row.raw, col)
-            if not _is_valid_name(name):
-                continue
-            position = _safe_get(row.raw, col + 1) or ""
-            hours = _to_number(_safe_get(row.raw, col + 2))
-            people.append((team, str(name).strip(), str(position).strip(), hours if hours is not None else 0.0))
+        position = _safe_get(row.raw, col + 1) or ""
+        hours = _to_number(_safe_get(row.raw, col + 2))
+        people.append((team, str(name).strip(), str(position).strip(), hours if hours is not None else 0.0))
     return people
 
 
+def _incident_from_row(row: SheetRow) -> Optional[Tuple[str, str, float, str]]:
+    label = row.text[0] if row.text else ""
+    if not label:
+        return None
+    qty = _to_number(_safe_get(row.raw, 1)) or 0.0
+    comments = row.text[2] if len(row.text) > 2 else ""
+    comments_clean = comments.strip()
+    if comments_clean.upper() in {"NA", "N/A"}:
+        comments_clean = ""
+    if qty == 0.0 and not comments_clean:
+        return None
+    return ("issue", label.strip(), qty, comments_clean)
+
+
+def extract_activities(rows: Iterable[SheetRow]) -> List[str]:
+    return parse_client_rows(rows).activities
+
+
+def extract_personnel(rows: Iterable[SheetRow]) -> List[Tuple[str, str, str, float]]:
+    return parse_client_rows(rows).personnel
+
+
 def _group_columns(group_row: SheetRow) -> List[Tuple[int, str]]:
     groups: List[Tuple[int, str]] = []
     for idx, cell in enumerate(group_row.text):
@@ -524,10 +926,10 @@ def _safe_get(row: Tuple[Optional[object], ...], index: int) -> Optional[object]
 def _is_valid_name(value: Optional[object]) -> bool:
     if value is None:
         return False
-    text = str(value).strip()
-    if not text or text.isdigit():
+    text = (value if type(value) is str else str(value)).strip()
+    if text.isdigit():
         return False
-    return text.lower() not in {"name", "contact"}
+    return text.lower() not in NON_NAME_VALUES
 
 
 def _to_number(value: Optional[object]) -> Optional[float]:
@@ -535,8 +937,9 @@ def _to_number(value: Optional[object]) -> Optional[float]:
         return None
     if isinstance(value, (int, float)):
         return float(value)
-    text = str(value).strip()
-    if not text:
+    text = value.strip() if isinstance(value, str) else str(value).strip()
+    # Text such as "Day shift" can't be a number; skip float() and its ValueError.
+    if not text or text[0] in NON_NUMBER_START_CHARS:
         return None
     try:
         return float(text.replace(",", ""))
@@ -544,22 +947,8 @@ def _to_number(value: Optional[object]) -> Optional[float]:
         return None
 
 
-def extract_delay_issue_rows(rows: Sequence[SheetRow]) -> List[Tuple[str, str, float, str]]:
-    entries: List[Tuple[str, str, float, str]] = []
-    in_delays = False
-    for row in rows:
-        if not in_delays:
-            if "DELAYS-OPPORTUNITY" in row.upper:
-                in_delays = True
-            continue
-        if "HSEQ" in row.upper:
-            break
-        text = row.joined.strip()
-        if not text:
-            continue
-        for chunk in _split_multiline(text):
-            entries.append(("delay", chunk, 0.0, ""))
-    return entries
+def extract_delay_issue_rows(rows: Iterable[SheetRow]) -> List[Tuple[str, str, float, str]]:
+    return parse_client_rows(rows).delays
 
 
 def _split_multiline(value: str) -> List[str]:
@@ -574,228 +963,203 @@ def _split_multiline(value: str) -> List[str]:
 
 
 def _should_stop_labour_section(label_upper: str) -> bool:
-    if not label_upper:
-        return False
-    stop_markers = [
-        "PLANT NOT",
-        "PLANNED WORKS",
-        "INCIDENTS",
-        "COMMUNICATIONS",
-        "DAILY WORK EXTENSION",
-        "DAILY WORK PHOTOS",
-    ]
-    return any(marker in label_upper for marker in stop_markers)
+    return LABOUR_STOP_RE.search(label_upper) is not None
 
 
 def _normalize_text(value: str) -> str:
-    return re.sub(r"\s+", " ", value.strip().lower()) if value else ""
+    return " ".join(value.lower().split()) if value else ""
 
 
-def extract_incidents(rows: Sequence[SheetRow]) -> List[Tuple[str, str, float, str]]:
-    entries: List[Tuple[str, str, float, str]] = []
-    in_section = False
-    header_skipped = False
-    for row in rows:
-        if not in_section:
-            if "INCIDENTS" in row.upper:
-                in_section = True
-            continue
-        if not header_skipped:
-            if "QTY" in row.upper or "COMMENTS" in row.upper:
-                header_skipped = True
-                continue
-        if "COMMUNICATIONS" in row.upper or "PRODUCTION" in row.upper:
-            break
-        label = row.text[0] if row.text else ""
-        if not label:
-            continue
-        qty = _to_number(_safe_get(row.raw, 1)) or 0.0
-        comments = row.text[2] if len(row.text) > 2 else ""
-        comments_clean = comments.strip()
-        if comments_clean.upper() in {"NA", "N/A"}:
-            comments_clean = ""
-        if qty == 0.0 and not comments_clean:
-            continue
-        entries.append(("issue", label.strip(), qty, comments_clean))
-    return entries
+def extract_incidents(rows: Iterable[SheetRow]) -> List[Tuple[str, str, float, str]]:
+    return parse_client_rows(rows).incidents
 
 
 def parse_client_sheets(client_root: Path) -> List[ClientSheetData]:
     entries: List[ClientSheetData] = []
     if not client_root.exists():
         return entries
-    for file_path in iter_excel_files(client_root):
-        try:
-            workbook = load_workbook(file_path, read_only=True, data_only=True)
-        except Exception as exc:
-            print(f"Failed to open {file_path}: {exc}")
+    for file_entries in map_files(_parse_client_file, iter_excel_files(client_root)):
+        entries.extend(file_entries)
+    return entries
+
+
+def _parse_client_file(file_path: Path) -> List[ClientSheetData]:
+    entries: List[ClientSheetData] = []
+    try:
+        sheets = read_workbook_sheets(file_path)
+    except Exception as exc:
+        print(f"Failed to open {file_path}: {exc}")
+        return entries
+    for sheet_name, values in sheets:
+        rows = iter_value_rows(values)
+        first_row = next(rows, None)
+        if first_row is None:
             continue
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            rows = list(iter_sheet_rows(worksheet))
-            if not rows:
-                continue
-            diary_date = extract_diary_date(rows)
-            if diary_date is None:
-                continue
-            entries.append(
-                ClientSheetData(
-                    diary_date=diary_date,
-                    source_file=str(file_path),
-                    worksheet=sheet_name,
-                    activities=extract_activities(rows),
-                    personnel=extract_personnel(rows),
-                    delays=extract_delay_issue_rows(rows),
-                    incidents=extract_incidents(rows),
-                )
+        sections = parse_client_rows(chain((first_row,), rows))
+        if sections.diary_date is None:
+            continue
+        entries.append(
+            ClientSheetData(
+                diary_date=sections.diary_date,
+                source_file=str(file_path),
+                worksheet=sheet_name,
+                activities=sections.activities,
+                personnel=sections.personnel,
+                delays=sections.delays,
+                incidents=sections.incidents,
             )
+        )
     return entries
 
 
+def map_files(parse_file: Callable[[Path], T], files: Sequence[Path]) -> Iterable[T]:
+    # Workbooks are independent, so parse them in worker processes; results come back
+    # in file order and all SQLite writes stay on the main process.
+    if len(files) < 2:
+        return [parse_file(file_path) for file_path in files]
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(parse_file, files, chunksize=PARSE_CHUNKSIZE))
+
+
 def ingest_client(db: DiaryDatabase, sheets: Iterable[ClientSheetData], stats: Dict[str, object]) -> None:
     grouped: Dict[date, List[ClientSheetData]] = defaultdict(list)
     for sheet in sheets:
         grouped[sheet.diary_date].append(sheet)
+    activity_rows: List[Tuple[object, ...]] = []
+    personnel_rows: List[Tuple[object, ...]] = []
+    # Keyed by (date, entry_type, normalised label, qty, normalised comments): the first
+    # sheet to report an entry wins, and the values are already unique for executemany.
+    delay_issue_rows: Dict[Tuple[str, str, str, float, str], Tuple[object, ...]] = {}
     for diary_date, date_sheets in grouped.items():
         diary_date_str = diary_date.isoformat()
-        activities_seen: Set[str] = set()
-        personnel_seen: Set[Tuple[str, str, str, float]] = set()
-        delays_seen: Set[Tuple[str, str, float, str]] = set()
-        incidents_seen: Set[Tuple[str, str, float, str]] = set()
+        # setdefault keeps the first sheet's row per normalised key in one dict operation.
+        activities: Dict[str, Tuple[object, ...]] = {}
+        personnel: Dict[Tuple[str, str, str, float], Optional[Tuple[object, ...]]] = {}
         for sheet in sorted(date_sheets, key=lambda item: (item.source_file, item.worksheet)):
+            source_file, worksheet = sheet.source_file, sheet.worksheet
             for activity in sheet.activities:
-                norm = _normalize_text(activity)
-                if not norm or norm in activities_seen:
-                    continue
-                activities_seen.add(norm)
-                if db.insert_activity(diary_date_str, activity, sheet.source_file, sheet.worksheet):
-                    stats["activities"] += 1
+                activities.setdefault(_normalize_text(activity), (diary_date_str, activity, source_file, worksheet))
             for team, name, position, hours in sheet.personnel:
-                key = (
-                    _normalize_text(team),
-                    _normalize_text(name),
-                    _normalize_text(position),
-                    float(hours or 0),
-                )
-                if key in personnel_seen:
-                    continue
-                personnel_seen.add(key)
-                if db.insert_person(diary_date_str, team, name, position, hours, sheet.source_file, sheet.worksheet):
-                    stats["personnel"] += 1
+                key = (_normalize_text(team), _normalize_text(name), _normalize_text(position), float(hours or 0))
+                if key not in personnel:
+                    personnel[key] = (
+                        _person_row(diary_date_str, team, name, position, hours, source_file, worksheet) if name else None
+                    )
             for entry_type, label, qty, comments in sheet.delays:
-                key = (entry_type, _normalize_text(label or ""), float(qty or 0), _normalize_text(comments or ""))
-                if key in delays_seen:
-                    continue
-                delays_seen.add(key)
-                if db.insert_delay_issue(diary_date_str, entry_type, "", label, qty, comments, sheet.source_file, sheet.worksheet):
-                    stats["delays_issues"] += 1
+                key = _delay_issue_key(diary_date_str, entry_type, label, qty, comments)
+                if key not in delay_issue_rows:
+                    delay_issue_rows[key] = _delay_issue_row(
+                        diary_date_str, entry_type, "", label, qty, comments, source_file, worksheet
+                    )
             for entry_type, label, qty, comments in sheet.incidents:
-                key = (entry_type, _normalize_text(label or ""), float(qty or 0), _normalize_text(comments or ""))
-                if key in incidents_seen:
-                    continue
-                incidents_seen.add(key)
-                if db.insert_delay_issue(diary_date_str, entry_type, label, "", qty, comments, sheet.source_file, sheet.worksheet):
-                    stats["delays_issues"] += 1
+                key = _delay_issue_key(diary_date_str, entry_type, label, qty, comments)
+                if key not in delay_issue_rows:
+                    delay_issue_rows[key] = _delay_issue_row(
+                        diary_date_str, entry_type, label, "", qty, comments, source_file, worksheet
+                    )
+        activities.pop("", None)
+        activity_rows.extend(activities.values())
+        personnel_rows.extend(row for row in personnel.values() if row is not None)
+    stats["activities"] += db.bulk_insert("activities", ACTIVITY_COLUMNS, activity_rows)
+    stats["personnel"] += db.bulk_insert("personnel", PERSONNEL_COLUMNS, personnel_rows)
+    stats["delays_issues"] += db.bulk_insert("delays_issues", DELAY_ISSUE_COLUMNS, delay_issue_rows.values())
+
+
+def _delay_issue_key(
+    diary_date: str, entry_type: str, label: str, qty: float, comments: str
+) -> Tuple[str, str, str, float, str]:
+    return (diary_date, entry_type, _normalize_text(label or ""), float(qty or 0), _normalize_text(comments or ""))
 
 
 def parse_supervisor_reports(supervisor_root: Path) -> List[SupervisorSheetData]:
     sheets: List[SupervisorSheetData] = []
     if not supervisor_root.exists():
         return sheets
-    for file_path in iter_excel_files(supervisor_root):
-        try:
-            workbook = load_workbook(file_path, read_only=True, data_only=True)
-        except Exception as exc:
-            print(f"Failed to open {file_path}: {exc}")
+    for file_sheets in map_files(_parse_supervisor_file, iter_excel_files(supervisor_root)):
+        sheets.extend(file_sheets)
+    return sheets
+
+
+def _parse_supervisor_file(file_path: Path) -> List[SupervisorSheetData]:
+    sheets: List[SupervisorSheetData] = []
+    try:
+        workbook_sheets = read_workbook_sheets(file_path)
+    except Exception as exc:
+        print(f"Failed to open {file_path}: {exc}")
+        return sheets
+    for sheet_name, values in workbook_sheets:
+        # The date search and both extractors share the sheet's value rows.
+        diary_date = extract_diary_date(iter_value_rows(values))
+        if diary_date is None:
             continue
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            rows = list(iter_sheet_rows(worksheet))
-            if not rows:
-                continue
-            diary_date = extract_diary_date(rows)
-            if diary_date is None:
-                continue
-            comments = extract_supervisor_comments(worksheet, diary_date, str(file_path), sheet_name)
-            extension = extract_extension_notes(worksheet)
-            sheets.append(
-                SupervisorSheetData(
-                    diary_date=diary_date,
-                    source_file=str(file_path),
-                    worksheet=sheet_name,
-                    comments=comments,
-                    extension_notes=extension,
-                )
+        comments = extract_supervisor_comments(values, diary_date, str(file_path), sheet_name)
+        extension = extract_extension_notes(values)
+        sheets.append(
+            SupervisorSheetData(
+                diary_date=diary_date,
+                source_file=str(file_path),
+                worksheet=sheet_name,
+                comments=comments,
+                extension_notes=extension,
             )
+        )
     return sheets
 
 
 def ingest_supervisor(db: DiaryDatabase, sheets: Iterable[SupervisorSheetData], stats: Dict[str, object]) -> None:
+    comment_rows: List[Tuple[object, ...]] = []
+    note_rows: List[Tuple[object, ...]] = []
     for sheet in sheets:
-        for record in sheet.comments:
-            if db.insert_supervisor_comment(record):
-                stats["supervisor_comments"] += 1
-        for note in sheet.extension_notes:
-            if db.insert_extension_note(sheet, note):
-                stats["supervisor_extension_notes"] += 1
+        diary_date_str = sheet.diary_date.isoformat()
+        comment_rows.extend(_supervisor_comment_row(record) for record in sheet.comments)
+        note_rows.extend((diary_date_str, note, sheet.source_file, sheet.worksheet) for note in sheet.extension_notes)
+    stats["supervisor_comments"] += db.bulk_insert("supervisor_comments", SUPERVISOR_COMMENT_COLUMNS, comment_rows)
+    stats["supervisor_extension_notes"] += db.bulk_insert(
+        "supervisor_extension_notes", EXTENSION_NOTE_COLUMNS, note_rows
+    )
 
 
 def parse_client_fallback(client_root: Path, skip_dates: Set[date]) -> List[FallbackActivity]:
-    entries: List[FallbackActivity] = []
     if not client_root.exists():
-        return entries
+        return []
+    return build_client_fallback(parse_client_sheets(client_root), skip_dates)
+
+
+def build_client_fallback(sheets: Iterable[ClientSheetData], skip_dates: Set[date]) -> List[FallbackActivity]:
+    entries: List[FallbackActivity] = []
     grouped: Dict[date, List[FallbackActivity]] = defaultdict(list)
     seen: Dict[date, Set[str]] = defaultdict(set)
-    for file_path in iter_excel_files(client_root):
-        try:
-            workbook = load_workbook(file_path, read_only=True, data_only=True)
-        except Exception as exc:
-            print(f"Failed to open {file_path}: {exc}")
+    for sheet in sheets:
+        diary_date = sheet.diary_date
+        if diary_date in skip_dates:
             continue
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            rows = list(iter_sheet_rows(worksheet))
-            if not rows:
+        for text in sheet.activities:
+            norm = _normalize_text(text)
+            if not norm or norm in seen[diary_date]:
                 continue
-            diary_date = extract_diary_date(rows)
-            if diary_date is None or diary_date in skip_dates:
-                continue
-            for text in extract_activities(rows):
-                norm = _normalize_text(text)
-                if not norm or norm in seen[diary_date]:
-                    continue
-                seen[diary_date].add(norm)
-                grouped[diary_date].append(
-                    FallbackActivity(
-                        diary_date=diary_date,
-                        text=text,
-                        source_file=str(file_path),
-                        worksheet=sheet_name,
-                    )
+            seen[diary_date].add(norm)
+            grouped[diary_date].append(
+                FallbackActivity(
+                    diary_date=diary_date,
+                    text=text,
+                    source_file=sheet.source_file,
+                    worksheet=sheet.worksheet,
                 )
+            )
     for date_key in sorted(grouped):
         entries.extend(grouped[date_key])
     return entries
 
 
 def ingest_fallback(db: DiaryDatabase, entries: Iterable[FallbackActivity], stats: Dict[str, object]) -> None:
-    for entry in entries:
-        if db.insert_fallback_activity(entry):
-            stats["fallback_activities"] += 1
+    rows = [_fallback_row(entry) for entry in entries]
+    stats["fallback_activities"] += db.bulk_insert("client_fallback_activities", FALLBACK_ACTIVITY_COLUMNS, rows)
 
 
 def validate_ingest(db: DiaryDatabase, *, require_coverage: bool = True) -> None:
     issues: List[str] = []
     cur = db.conn.cursor()
-    tables = [
-        "activities",
-        "personnel",
-        "delays_issues",
-        "supervisor_comments",
-        "supervisor_extension_notes",
-        "client_fallback_activities",
-    ]
-    for table in tables:
+    for table in DIARY_TABLES:
         cur.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (table,))
         exists = cur.fetchone()[0]
         if not exists:
@@ -831,7 +1195,7 @@ def validate_ingest(db: DiaryDatabase, *, require_coverage: bool = True) -> None
             )
             """
         )
-        uncovered = [row[0] for row in cur.fetchall()]
+        uncovered = [row[0] for row in cur]
         if uncovered:
             issues.append(
                 "Missing supervisor and fallback coverage on dates: "
@@ -864,36 +1228,32 @@ def validate_ingest(db: DiaryDatabase, *, require_coverage: bool = True) -> None
 
 
 def extract_supervisor_comments(
-    worksheet, diary_date: date, source_file: str, sheet_name: str
+    values: Iterable[Sequence[Optional[object]]], diary_date: date, source_file: str, sheet_name: str
 ) -> List[SupervisorCommentRecord]:
     entries: List[SupervisorCommentRecord] = []
-    header_row_seen = False
-    for row_index in range(1, worksheet.max_row + 1):
-        hours_header = _text(worksheet.cell(row_index, 3).value)
-        machine_header = _text(worksheet.cell(row_index, 4).value)
-        if not header_row_seen:
-            if hours_header.lower() == "hours" and machine_header.lower() == "machine":
-                header_row_seen = True
-            continue
-        label = _text(worksheet.cell(row_index, 2).value)
-        upper_label = label.upper()
-        if _should_stop_labour_section(upper_label):
+    rows = iter(values)
+    for row in rows:
+        if _text(_safe_get(row, 2)).lower() == "hours" and _text(_safe_get(row, 3)).lower() == "machine":
+            break
+    for row in rows:
+        label = _text(_safe_get(row, 1))
+        if _should_stop_labour_section(label.upper()):
             break
-        comment = _text(worksheet.cell(row_index, 11).value)
+        comment = _text(_safe_get(row, 10))
         if not comment:
             continue
         entries.append(
             SupervisorCommentRecord(
                 diary_date=diary_date,
                 label=label,
-                hours=_to_number(worksheet.cell(row_index, 3).value),
-                machine=_text(worksheet.cell(row_index, 4).value),
-                start_smu=_text(worksheet.cell(row_index, 5).value),
-                end_smu=_text(worksheet.cell(row_index, 6).value),
-                machine_hours=_text(worksheet.cell(row_index, 7).value),
-                location=_text(worksheet.cell(row_index, 8).value),
-                activity=_text(worksheet.cell(row_index, 9).value),
-                material=_text(worksheet.cell(row_index, 10).value),
+                hours=_to_number(_safe_get(row, 2)),
+                machine=_text(_safe_get(row, 3)),
+                start_smu=_text(_safe_get(row, 4)),
+                end_smu=_text(_safe_get(row, 5)),
+                machine_hours=_text(_safe_get(row, 6)),
+                location=_text(_safe_get(row, 7)),
+                activity=_text(_safe_get(row, 8)),
+                material=_text(_safe_get(row, 9)),
                 comment=comment,
                 source_file=source_file,
                 worksheet=sheet_name,
@@ -902,37 +1262,44 @@ def extract_supervisor_comments(
     return entries
 
 
-def extract_extension_notes(worksheet) -> List[str]:
-    start_row = None
-    end_row = None
-    for row_index in range(1, worksheet.max_row + 1):
-        row_text = _row_text(worksheet, row_index).lower()
-        if start_row is None and "daily work extension" in row_text:
-            start_row = row_index + 1
-            continue
-        if start_row is not None and "daily work photos" in row_text:
-            end_row = row_index
-            break
-    if start_row is None or end_row is None or start_row >= end_row:
-        return []
+def extract_extension_notes(values: Iterable[Sequence[Optional[object]]]) -> List[str]:
+    # Notes are the non-empty rows between the "daily work extension" and "daily work photos"
+    # rows; a section without its closing row yields nothing.
     notes: List[str] = []
-    for row_index in range(start_row, end_row):
-        note_text = _row_text(worksheet, row_index)
-        if note_text:
-            notes.append(note_text)
-    return notes
+    in_section = False
+    for row in values:
+        row_text = _row_text(row)
+        if not in_section:
+            in_section = "daily work extension" in row_text.lower()
+            continue
+        if "daily work photos" in row_text.lower():
+            return notes
+        if row_text:
+            notes.append(row_text)
+    return []
+
+
+def _is_sqlite_uri(database: Union[Path, str]) -> bool:
+    return isinstance(database, str) and database.startswith("file:")
 
 
-def run_ingest(args: argparse.Namespace) -> Dict[str, object]:
+def _database_location(database: str) -> Union[Path, str]:
+    if _is_sqlite_uri(database):
+        return database
+    return Path(database).expanduser().resolve()
+
+
+def run_ingest(args: argparse.Namespace, db: Optional[DiaryDatabase] = None) -> Dict[str, object]:
+    # db lets a caller (the tests) ingest into a database it already holds open and query it
+    # on the same warm connection afterwards; the caller then owns it and closes it.
     root = Path(args.root).expanduser().resolve()
     client_root = (root / args.client_dir).resolve()
     supervisor_root = (root / args.supervisor_dir).resolve()
-    db_path = Path(args.database).expanduser().resolve()
+    db_path = _database_location(args.database)
 
     use_supervisor = args.use_supervisor and not args.skip_supervisor
     use_fallback = args.use_client_fallback and not args.skip_client_fallback
 
-    db = DiaryDatabase(db_path, reset=False)
     stats: Dict[str, object] = {
         "activities": 0,
         "personnel": 0,
@@ -954,33 +1321,48 @@ def run_ingest(args: argparse.Namespace) -> Dict[str, object]:
     fallback_entries: List[FallbackActivity] = []
     if use_fallback:
         skip_dates = supervisor_covered_dates if use_supervisor else set()
-        fallback_entries = parse_client_fallback(client_root, skip_dates)
-
-    touched_dates: Set[str] = {sheet.diary_date.isoformat() for sheet in client_sheets}
-    touched_dates.update(date.isoformat() for date in supervisor_dates)
-    touched_dates.update(entry.diary_date.isoformat() for entry in fallback_entries)
-
-    if args.reset:
-        db.delete_dates(touched_dates)
-
-    ingest_client(db, client_sheets, stats)
-    if use_supervisor:
-        ingest_supervisor(db, supervisor_sheets, stats)
-    if use_fallback:
-        ingest_fallback(db, fallback_entries, stats)
-
-    db.commit()
-    validate_ingest(db, require_coverage=use_supervisor or use_fallback)
+        # Reuse the client sheets parsed above instead of loading every workbook again.
+        fallback_entries = build_client_fallback(client_sheets, skip_dates)
+
+    # Collect the dates first so each one is formatted once, however many sources share it.
+    touched: Set[date] = {sheet.diary_date for sheet in client_sheets}
+    touched.update(supervisor_dates)
+    touched.update(entry.diary_date for entry in fallback_entries)
+    touched_dates = [diary_date.isoformat() for diary_date in sorted(touched)]
+
+    # Opened only after parsing, so the forked parse workers never inherit the SQLite handle.
+    owns_db = db is None
+    if db is None:
+        db = DiaryDatabase(db_path, reset=False)
+    try:
+        with db.transaction():
+            if args.reset:
+                db.delete_dates(touched_dates)
+            with db.bulk_load():
+                ingest_client(db, client_sheets, stats)
+                if use_supervisor:
+                    ingest_supervisor(db, supervisor_sheets, stats)
+                if use_fallback:
+                    ingest_fallback(db, fallback_entries, stats)
+        db.conn.execute("ANALYZE")
+
+        validate_ingest(db, require_coverage=use_supervisor or use_fallback)
+    finally:
+        if owns_db:
+            db.close()
     stats["database_path"] = str(db_path)
     return stats
 
 
 def run_validate(database: str, *, require_coverage: bool = True) -> None:
-    db_path = Path(database).expanduser().resolve()
-    if not db_path.exists():
+    db_path = _database_location(database)
+    if not _is_sqlite_uri(db_path) and not Path(db_path).exists():
         raise FileNotFoundError(f"Database not found: {db_path}")
     db = DiaryDatabase(db_path, reset=False)
-    validate_ingest(db, require_coverage=require_coverage)
+    try:
+        validate_ingest(db, require_coverage=require_coverage)
+    finally:
+        db.close()
 
 
 def main() -> None:
@@ -11,14 +11,14 @@ from __future__ import annotations
 
 import argparse
 import csv
-import re
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache, partial
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence, Set, Tuple
-
-from openpyxl import load_workbook
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
 
 import build_diary_database as diary
 
@@ -152,102 +152,140 @@ def gather_entries(root: Path) -> Tuple[List[ActivityEntry], List[PersonnelEntry
         errors.append(f"No Excel files found under {root}")
         return activities, personnel, date_sources, errors
 
-    for file_path in files:
-        try:
-            workbook = load_workbook(file_path, read_only=True, data_only=True)
-        except Exception as exc:  # pragma: no cover - defensive logging
-            errors.append(f"Failed to open {file_path}: {exc}")
-            continue
-        relative_file = _relative_to_root(file_path, root)
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            rows = list(diary.iter_sheet_rows(worksheet))
-            if not rows:
-                continue
-            diary_date = diary.extract_diary_date(rows)
-            if diary_date is None:
-                errors.append(f"Skipping {relative_file}::{sheet_name} (no diary date found)")
-                continue
-            source_label = f"{relative_file}::{sheet_name}"
+    for file_activities, file_personnel, file_sources, file_errors in diary.map_files(
+        partial(_gather_file_entries, root=root), files
+    ):
+        activities.extend(file_activities)
+        personnel.extend(file_personnel)
+        for diary_date, source_label in file_sources:
             date_sources[diary_date].add(source_label)
-            for activity_text in extract_activity_cells(rows):
-                activities.append(
-                    ActivityEntry(
-                        diary_date=diary_date,
-                        activity=activity_text,
-                        source_file=relative_file,
-                        worksheet=sheet_name,
-                    )
+        errors.extend(file_errors)
+    return activities, personnel, date_sources, errors
+
+
+def _gather_file_entries(
+    file_path: Path, root: Path
+) -> Tuple[List[ActivityEntry], List[PersonnelEntry], List[Tuple[date, str]], List[str]]:
+    activities: List[ActivityEntry] = []
+    personnel: List[PersonnelEntry] = []
+    sources: List[Tuple[date, str]] = []
+    errors: List[str] = []
+    try:
+        sheets = diary.read_workbook_sheets(file_path)
+    except Exception as exc:  # pragma: no cover - defensive logging
+        errors.append(f"Failed to open {file_path}: {exc}")
+        return activities, personnel, sources, errors
+    relative_file = _relative_to_root(file_path, root)
+    for sheet_name, values in sheets:
+        rows = diary.iter_value_rows(values)
+        first_row = next(rows, None)
+        if first_row is None:
+            continue
+        activity_texts: List[str] = []
+        sections = diary.parse_client_rows(_collect_activity_cells(chain((first_row,), rows), activity_texts))
+        diary_date = sections.diary_date
+        if diary_date is None:
+            errors.append(f"Skipping {relative_file}::{sheet_name} (no diary date found)")
+            continue
+        sources.append((diary_date, f"{relative_file}::{sheet_name}"))
+        for activity_text in activity_texts:
+            activities.append(
+                ActivityEntry(
+                    diary_date=diary_date,
+                    activity=activity_text,
+                    source_file=relative_file,
+                    worksheet=sheet_name,
                 )
-            for team, name, position, hours in diary.extract_personnel(rows):
-                personnel.append(
-                    PersonnelEntry(
-                        diary_date=diary_date,
-                        team=team.strip(),
-                        name=name.strip(),
-                        position=(position or "").strip(),
-                        hours=float(hours or 0.0),
-                        source_file=relative_file,
-                        worksheet=sheet_name,
-                    )
+            )
+        # parse_client_rows already yields stripped strings and float hours (0.0 when blank).
+        for team, name, position, hours in sections.personnel:
+            personnel.append(
+                PersonnelEntry(
+                    diary_date=diary_date,
+                    team=team,
+                    name=name,
+                    position=position,
+                    hours=hours,
+                    source_file=relative_file,
+                    worksheet=sheet_name,
                 )
-    return activities, personnel, date_sources, errors
+            )
+    return activities, personnel, sources, errors
 
 
-def extract_activity_cells(rows: Sequence[diary.SheetRow]) -> List[str]:
+def extract_activity_cells(rows: Iterable[diary.SheetRow]) -> List[str]:
     activities: List[str] = []
+    for _ in _collect_activity_cells(rows, activities):
+        pass
+    return activities
+
+
+def _collect_activity_cells(rows: Iterable[diary.SheetRow], activities: List[str]) -> Iterator[diary.SheetRow]:
+    # Passes every row through unchanged while appending the PRODUCTION cells to activities,
+    # so gather_entries can parse a sheet in one streamed pass.
     in_section = False
+    done = False
     for row in rows:
-        row_upper = row.upper
+        yield row
+        if done:
+            continue
+        markers = row.markers
         if not in_section:
-            if "PRODUCTION" in row_upper:
+            if "PRODUCTION" in markers:
                 in_section = True
             continue
-        if "PHOTOS" in row_upper:
-            break
-        if "COMMUNICATIONS" in row_upper:
+        if "PHOTOS" in markers:
+            done = True
+            continue
+        if "COMMUNICATIONS" in markers:
             continue
+        # Row markers come from the row's uppercased text, so cells only need their own
+        # PRODUCTION check when the row carries that marker. A PHOTOS cell or line would have
+        # ended the section above, so nothing left here can be the bare PHOTOS heading.
+        check_cells = "PRODUCTION" in markers
+        append = activities.append
         for cell in row.text:
-            if not cell:
+            if not cell or (check_cells and "PRODUCTION" in cell.upper()):
                 continue
-            if "PRODUCTION" in cell.upper():
-                continue
-            for chunk in split_multiline(cell):
-                cleaned = chunk.strip()
-                if cleaned and cleaned.upper() not in {"PHOTOS"}:
-                    activities.append(cleaned)
-    return activities
+            # Cell text is already stripped, so single-line cells need no splitting.
+            if "\n" not in cell and "\r" not in cell:
+                append(cell)
+            else:
+                activities.extend(split_multiline(cell))
 
 
 def annotate_activity_entries(
     entries: Sequence[ActivityEntry], date_sources: Dict[date, Set[str]]
 ) -> Tuple[List[dict], List[dict]]:
+    normalize = lru_cache(maxsize=None)(normalize_text)
     grouped: Dict[Tuple[date, str], List[ActivityEntry]] = defaultdict(list)
     for entry in entries:
-        grouped[(entry.diary_date, normalize_text(entry.activity))].append(entry)
+        grouped[(entry.diary_date, normalize(entry.activity))].append(entry)
+    sources_by_date = _sources_by_date(date_sources)
     rows: List[dict] = []
     summary: List[dict] = []
+    add_row = rows.append
     for (entry_date, _), items in grouped.items():
         canonical = items[0].activity
-        all_sources = sorted(date_sources.get(entry_date, set()))
-        sources_present = sorted({item.source_label for item in items})
-        missing = sorted(set(all_sources) - set(sources_present))
+        all_sources, all_sources_text = sources_by_date.get(entry_date, ([], ""))
+        sources_present, missing = _split_sources(items, all_sources)
         status, unique_flag = describe_presence(sources_present, missing, len(all_sources))
+        diary_date_text = entry_date.isoformat()
         for item in items:
-            rows.append(
+            add_row(
                 {
-                    "diary_date": entry_date.isoformat(),
+                    "diary_date": diary_date_text,
                     "activity_text": item.activity,
                     "source_file": item.source_file,
                     "worksheet": item.worksheet,
                     "unique_to_source": unique_flag,
                     "status": status,
-                    "all_sources_for_date": "; ".join(all_sources),
+                    "all_sources_for_date": all_sources_text,
                 }
             )
         summary.append(
             {
-                "diary_date": entry_date.isoformat(),
+                "diary_date": diary_date_text,
                 "activity_text": canonical,
                 "sources_present": "; ".join(sources_present),
                 "sources_missing": "; ".join(missing),
@@ -255,37 +293,40 @@ def annotate_activity_entries(
                 "report_copies_for_date": len(all_sources),
             }
         )
-    rows.sort(key=lambda row: (row["diary_date"], row["activity_text"], row["source_file"]))
-    summary.sort(key=lambda row: (row["diary_date"], row["activity_text"]))
+    rows.sort(key=itemgetter("diary_date", "activity_text", "source_file"))
+    summary.sort(key=itemgetter("diary_date", "activity_text"))
     return rows, summary
 
 
 def annotate_personnel_entries(
     entries: Sequence[PersonnelEntry], date_sources: Dict[date, Set[str]]
 ) -> Tuple[List[dict], List[dict]]:
+    normalize = lru_cache(maxsize=None)(normalize_text)
     grouped: Dict[Tuple[date, str, str, str, float], List[PersonnelEntry]] = defaultdict(list)
     for entry in entries:
         grouped[
             (
                 entry.diary_date,
-                normalize_text(entry.team),
-                normalize_text(entry.name),
-                normalize_text(entry.position),
+                normalize(entry.team),
+                normalize(entry.name),
+                normalize(entry.position),
                 float(entry.hours),
             )
         ].append(entry)
+    sources_by_date = _sources_by_date(date_sources)
     rows: List[dict] = []
     summary: List[dict] = []
+    add_row = rows.append
     for (entry_date, _, _, _, _), items in grouped.items():
         representative = items[0]
-        all_sources = sorted(date_sources.get(entry_date, set()))
-        sources_present = sorted({item.source_label for item in items})
-        missing = sorted(set(all_sources) - set(sources_present))
+        all_sources, all_sources_text = sources_by_date.get(entry_date, ([], ""))
+        sources_present, missing = _split_sources(items, all_sources)
         status, unique_flag = describe_presence(sources_present, missing, len(all_sources))
+        diary_date_text = entry_date.isoformat()
         for item in items:
-            rows.append(
+            add_row(
                 {
-                    "diary_date": entry_date.isoformat(),
+                    "diary_date": diary_date_text,
                     "team": item.team,
                     "name": item.name,
                     "position": item.position,
@@ -294,12 +335,12 @@ def annotate_personnel_entries(
                     "worksheet": item.worksheet,
                     "unique_to_source": unique_flag,
                     "status": status,
-                    "all_sources_for_date": "; ".join(all_sources),
+                    "all_sources_for_date": all_sources_text,
                 }
             )
         summary.append(
             {
-                "diary_date": entry_date.isoformat(),
+                "diary_date": diary_date_text,
                 "team": representative.team,
                 "name": representative.name,
                 "position": representative.position,
@@ -310,11 +351,27 @@ def annotate_personnel_entries(
                 "report_copies_for_date": len(all_sources),
             }
         )
-    rows.sort(key=lambda row: (row["diary_date"], row["team"], row["name"], row["source_file"]))
-    summary.sort(key=lambda row: (row["diary_date"], row["team"], row["name"]))
+    rows.sort(key=itemgetter("diary_date", "team", "name", "source_file"))
+    summary.sort(key=itemgetter("diary_date", "team", "name"))
     return rows, summary
 
 
+def _sources_by_date(date_sources: Dict[date, Set[str]]) -> Dict[date, Tuple[List[str], str]]:
+    # Sorted and joined once per date rather than once per group.
+    by_date: Dict[date, Tuple[List[str], str]] = {}
+    for entry_date, sources in date_sources.items():
+        ordered = sorted(sources)
+        by_date[entry_date] = (ordered, "; ".join(ordered))
+    return by_date
+
+
+def _split_sources(
+    items: Sequence[ActivityEntry | PersonnelEntry], all_sources: Sequence[str]
+) -> Tuple[List[str], List[str]]:
+    present = {item.source_label for item in items}
+    return sorted(present), [source for source in all_sources if source not in present]
+
+
 def describe_presence(
     sources_present: Sequence[str], missing_sources: Sequence[str], total_sources: int
 ) -> Tuple[str, bool]:
@@ -337,14 +394,15 @@ def describe_presence(
 
 def write_csv(path: Path, headers: List[str], rows: Iterable[dict]) -> None:
     with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=headers)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
+        # Same output as DictWriter (missing keys become empty cells) without its per-row
+        # key validation.
+        writer = csv.writer(handle)
+        writer.writerow(headers)
+        writer.writerows(tuple(row.get(header, "") for header in headers) for row in rows)
 
 
 def normalize_text(value: str) -> str:
-    return re.sub(r"\s+", " ", value.strip().lower())
+    return " ".join(value.lower().split())
 
 
 def split_multiline(value: str) -> List[str]:
@@ -13,8 +13,11 @@ import argparse
 import csv
 import json
 import sqlite3
+import textwrap
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
 
 
 def parse_args() -> argparse.Namespace:
@@ -24,76 +27,93 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def fetch_rows(conn: sqlite3.Connection, query: str, params: Tuple = ()) -> List[Dict[str, object]]:
-    cursor = conn.execute(query, params)
-    columns = [description[0] for description in cursor.description]
-    return [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-
-def build_day_record(conn: sqlite3.Connection, diary_date: str) -> Dict[str, object]:
-    day: Dict[str, object] = {"diary_date": diary_date}
-    day["activities"] = fetch_rows(
-        conn,
-        """
-        SELECT activity, source_file, worksheet
+# Each query returns diary_date first; rows within a day keep the per-day ordering.
+DAY_SECTION_QUERIES: Dict[str, str] = {
+    "activities": """
+        SELECT diary_date, activity, source_file, worksheet
         FROM activities
-        WHERE diary_date = ?
-        ORDER BY source_file, worksheet, activity
-        """,
-        (diary_date,),
-    )
-    day["personnel"] = fetch_rows(
-        conn,
-        """
-        SELECT team_type, name, position, hours, source_file, worksheet
+        ORDER BY diary_date, source_file, worksheet, activity
+    """,
+    "personnel": """
+        SELECT diary_date, team_type, name, position, hours, source_file, worksheet
         FROM personnel
-        WHERE diary_date = ?
-        ORDER BY team_type, name
-        """,
-        (diary_date,),
-    )
-    day["delays_issues"] = fetch_rows(
-        conn,
-        """
-        SELECT entry_type, label, description, qty, comments, source_file, worksheet
+        ORDER BY diary_date, team_type, name
+    """,
+    "delays_issues": """
+        SELECT diary_date, entry_type, label, description, qty, comments, source_file, worksheet
         FROM delays_issues
-        WHERE diary_date = ?
-        ORDER BY entry_type, label
-        """,
-        (diary_date,),
-    )
-    day["supervisor_comments"] = fetch_rows(
-        conn,
-        """
-        SELECT worker_or_group, hours, machine, start_smu, end_smu, machine_hours,
+        ORDER BY diary_date, entry_type, label
+    """,
+    "supervisor_comments": """
+        SELECT diary_date, worker_or_group, hours, machine, start_smu, end_smu, machine_hours,
                location, activity, material, comment, source_file, worksheet
         FROM supervisor_comments
-        WHERE diary_date = ?
-        ORDER BY worker_or_group
-        """,
-        (diary_date,),
-    )
-    day["supervisor_extension_notes"] = fetch_rows(
-        conn,
-        """
-        SELECT note, source_file, worksheet
+        ORDER BY diary_date, worker_or_group
+    """,
+    "supervisor_extension_notes": """
+        SELECT diary_date, note, source_file, worksheet
         FROM supervisor_extension_notes
-        WHERE diary_date = ?
-        ORDER BY source_file, worksheet
-        """,
-        (diary_date,),
-    )
-    day["fallback_activities"] = fetch_rows(
-        conn,
-        """
-        SELECT activity, source_file, worksheet
+        ORDER BY diary_date, source_file, worksheet
+    """,
+    "fallback_activities": """
+        SELECT diary_date, activity, source_file, worksheet
         FROM client_fallback_activities
-        WHERE diary_date = ?
-        ORDER BY source_file, worksheet, activity
-        """,
-        (diary_date,),
-    )
-    return day
+        ORDER BY diary_date, source_file, worksheet, activity
+    """,
+}
+
+
+def iter_rows_by_date(
+    conn: sqlite3.Connection, query: str, parameters: Sequence[object] = ()
+) -> Iterator[Tuple[str, List[Dict[str, object]]]]:
+    cursor = conn.execute(query, parameters)
+    columns = [description[0] for description in cursor.description][1:]
+    # Queries are ordered by diary_date, so each day's rows arrive as one run.
+    for diary_date, day_rows in groupby(cursor, itemgetter(0)):
+        yield diary_date, [dict(zip(columns, row[1:])) for row in day_rows]
+
+
+def iter_day_records(conn: sqlite3.Connection, dates: Optional[Iterable[str]] = None) -> Iterator[Dict[str, object]]:
+    # Only one day's rows are in memory at a time. Explicit dates are fetched one date at a
+    # time; without them, every date with at least one row in any table is reported by
+    # stepping through the date-ordered section cursors together.
+    if dates is not None:
+        for diary_date in dates:
+            day: Dict[str, object] = {"diary_date": diary_date}
+            for key, query in DAY_SECTION_QUERIES.items():
+                rows = iter_rows_by_date(conn, f"SELECT * FROM ({query}) WHERE diary_date = ?", (diary_date,))
+                day[key] = next(rows, (diary_date, []))[1]
+            yield day
+        return
+    streams = {key: iter_rows_by_date(conn, query) for key, query in DAY_SECTION_QUERIES.items()}
+    heads = {key: next(stream, None) for key, stream in streams.items()}
+    while any(heads.values()):
+        diary_date = min(head[0] for head in heads.values() if head)
+        day = {"diary_date": diary_date}
+        for key, head in heads.items():
+            if head and head[0] == diary_date:
+                day[key] = head[1]
+                heads[key] = next(streams[key], None)
+            else:
+                day[key] = []
+        yield day
+
+
+def build_day_records(conn: sqlite3.Connection, dates: Optional[Iterable[str]] = None) -> List[Dict[str, object]]:
+    return list(iter_day_records(conn, dates))
+
+
+def write_day_records(handle: TextIO, days: Iterable[Dict[str, object]]) -> List[Dict[str, object]]:
+    # Writes the same text as json.dump(list(days), handle, indent=2) one day at a time and
+    # returns the per-day summaries.
+    summaries: List[Dict[str, object]] = []
+    handle.write("[")
+    for day in days:
+        handle.write(",\n" if summaries else "\n")
+        handle.write(textwrap.indent(json.dumps(day, indent=2), "  "))
+        summaries.append(summarize_day(day))
+    handle.write("\n]" if summaries else "]")
+    return summaries
 
 
 def summarize_day(day: Dict[str, object]) -> Dict[str, object]:
@@ -121,35 +141,9 @@ def main() -> None:
         raise FileNotFoundError(f"Database not found: {db_path}")
 
     conn = sqlite3.connect(db_path)
-    cursor = conn.execute(
-        """
-        SELECT diary_date FROM (
-            SELECT diary_date FROM activities
-            UNION
-            SELECT diary_date FROM personnel
-            UNION
-            SELECT diary_date FROM delays_issues
-            UNION
-            SELECT diary_date FROM supervisor_comments
-            UNION
-            SELECT diary_date FROM supervisor_extension_notes
-            UNION
-            SELECT diary_date FROM client_fallback_activities
-        )
-        ORDER BY diary_date
-        """
-    )
-    dates = [row[0] for row in cursor.fetchall()]
-    days: List[Dict[str, object]] = []
-    summaries: List[Dict[str, object]] = []
-    for diary_date in dates:
-        day = build_day_record(conn, diary_date)
-        days.append(day)
-        summaries.append(summarize_day(day))
-
     json_path = output_dir / "daily_report.json"
     with json_path.open("w", encoding="utf-8") as handle:
-        json.dump(days, handle, indent=2)
+        summaries = write_day_records(handle, iter_day_records(conn))
 
     summary_path = output_dir / "daily_report_summary.csv"
     with summary_path.open("w", newline="", encoding="utf-8") as handle:
@@ -158,7 +152,7 @@ def main() -> None:
         for row in summaries:
             writer.writerow(row)
 
-    print(f"Wrote {len(days)} day-level reports to {json_path}")
+    print(f"Wrote {len(summaries)} day-level reports to {json_path}")
     print(f"Wrote summary CSV to {summary_path}")
 
 
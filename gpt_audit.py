@@ -7,13 +7,19 @@ By default this script runs in dry-run mode to avoid accidental API calls.
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import logging
 import os
+import random
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from textwrap import dedent
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 # Load environment variables from .env file
 try:
@@ -23,10 +29,10 @@ except ImportError:
     pass  # python-dotenv not installed, rely on system env vars
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, OpenAIError
     legacy_openai = None
 except ImportError:  # pragma: no cover - optional dependency
-    OpenAI = None
+    OpenAI = OpenAIError = None
     try:  # Fallback for older openai releases
         import openai as legacy_openai
     except ImportError:  # pragma: no cover - optional dependency
@@ -35,6 +41,29 @@ except ImportError:  # pragma: no cover - optional dependency
 
 logger = logging.getLogger("gpt_audit")
 
+DEFAULT_CONCURRENCY = 8
+SAMPLE_FETCH_CHUNK = 500
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_POLL_SECONDS = 10.0
+BATCH_MAX_POLL_SECONDS = 300.0
+BATCH_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+# Batch mode needs the openai>=1.0 client, whose API and connection errors share OpenAIError.
+BATCH_ERRORS = (RuntimeError,) if OpenAIError is None else (RuntimeError, OpenAIError)
+DEFAULT_MAX_ATTEMPTS = 6
+RETRY_MIN_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+RETRYABLE_ERROR_NAMES = frozenset(
+    {"APIConnectionError", "APITimeoutError", "RateLimitError", "ServiceUnavailableError", "Timeout"}
+)
+# Same durability trade-off as the ingest: WAL + synchronous=NORMAL skips the fsync of a
+# rollback journal on the results commit. All writes stay on the main thread's connection.
+AUDIT_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Spot-check diary entries with GPT.")
@@ -47,20 +76,72 @@ def parse_args() -> argparse.Namespace:
         default=True,
         help="Print the prompts without calling the API (default on). Use --no-dry-run to send requests.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum number of API requests in flight at once (default {DEFAULT_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help=f"Attempts per request when the API rate-limits or errors (default {DEFAULT_MAX_ATTEMPTS}).",
+    )
+    parser.add_argument(
+        "--max-rpm", type=float, default=0, help="Requests per minute to stay under (default 0: unlimited)."
+    )
+    parser.add_argument(
+        "--max-tpm",
+        type=float,
+        default=0,
+        help="Estimated prompt tokens per minute to stay under (default 0: unlimited).",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit all prompts through the OpenAI Batch API (cheaper, may take up to 24h) and wait for results.",
+    )
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither reuse nor store answers in the audit_cache table; every prompt is sent.",
+    )
+    cache.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Send every prompt again and overwrite its cached answer.",
+    )
     return parser.parse_args()
 
 
+def connect_database(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    for pragma in AUDIT_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
 def fetch_samples(conn: sqlite3.Connection, table: str, count: int) -> List[Tuple[int, str, str, str]]:
-    cursor = conn.execute(
-        f"""
-        SELECT id, diary_date, source_file, comment
-        FROM {table}
-        ORDER BY RANDOM()
-        LIMIT ?
-        """,
-        (count,),
-    )
-    return cursor.fetchall()
+    # Pick ids in Python instead of ORDER BY RANDOM(), which sorts the whole table on a random
+    # key. The id scan only touches the rowid b-tree. A negative count means every row, as
+    # LIMIT -1 did.
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM {table}")]
+    chosen = random.sample(ids, len(ids) if count < 0 else min(count, len(ids)))
+    rows: Dict[int, Tuple[int, str, str, str]] = {}
+    for start in range(0, len(chosen), SAMPLE_FETCH_CHUNK):
+        chunk = chosen[start : start + SAMPLE_FETCH_CHUNK]
+        cursor = conn.execute(
+            f"""
+            SELECT id, diary_date, source_file, comment
+            FROM {table}
+            WHERE id IN ({", ".join("?" for _ in chunk)})
+            """,
+            chunk,
+        )
+        rows.update((row[0], row) for row in cursor)
+    return [rows[comment_id] for comment_id in chosen]
 
 
 def build_prompt(diary_date: str, source_file: str, comment: str) -> str:
@@ -79,7 +160,8 @@ def build_prompt(diary_date: str, source_file: str, comment: str) -> str:
 
 def _get_openai_client(api_key: str):
     if OpenAI is not None:
-        return "chat_completions", OpenAI(api_key=api_key)
+        # Retries are handled by send_with_retry so the backoff and throttling stay in one place.
+        return "chat_completions", OpenAI(api_key=api_key, max_retries=0)
     if legacy_openai is not None:
         legacy_openai.api_key = api_key
         return "legacy", legacy_openai
@@ -114,6 +196,151 @@ def _send_prompt(client_kind: str, client, model: str, prompt: str) -> str:
     return str(content or "").strip()
 
 
+class TokenBucket:
+    # Thread-safe budget that refills continuously at per_minute / 60 units per second.
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.available = per_minute
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        # Requests bigger than the whole budget wait for a full bucket rather than forever.
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+
+def _estimate_tokens(prompt: str) -> int:
+    # Roughly four characters per token for English text; only used for throttling.
+    return len(prompt) // 4 + 1
+
+
+def _is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "http_status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def send_with_retry(
+    client_kind: str,
+    client,
+    model: str,
+    prompt: str,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    requests_bucket: Optional[TokenBucket] = None,
+    tokens_bucket: Optional[TokenBucket] = None,
+) -> str:
+    # Rate limits and server errors back off with full jitter (1s, 2s, 4s ... capped at 60s);
+    # anything else, or the last failed attempt, is raised to the caller.
+    attempt = 1
+    while True:
+        if requests_bucket is not None:
+            requests_bucket.acquire()
+        if tokens_bucket is not None:
+            tokens_bucket.acquire(_estimate_tokens(prompt))
+        try:
+            return _send_prompt(client_kind, client, model, prompt)
+        except Exception as exc:
+            if attempt >= max_attempts or not _is_retryable(exc):
+                raise
+            delay = random.uniform(RETRY_MIN_SECONDS, min(RETRY_MAX_SECONDS, RETRY_MIN_SECONDS * 2 ** (attempt - 1)))
+            logger.warning("Retrying after %s (attempt %d/%d, %.1fs)", exc, attempt, max_attempts, delay)
+        time.sleep(delay)
+        attempt += 1
+
+
+def build_batch_requests(samples: Sequence[Tuple[int, str, str, str]], model: str) -> str:
+    lines = []
+    for comment_id, diary_date, source_file, comment in samples:
+        request = {
+            "custom_id": str(comment_id),
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": model,
+                "messages": [{"role": "user", "content": build_prompt(diary_date, source_file, comment)}],
+                "temperature": 0,
+            },
+        }
+        lines.append(json.dumps(request))
+    return "\n".join(lines) + "\n"
+
+
+def parse_batch_output(text: str) -> Dict[int, str]:
+    answers: Dict[int, str] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            logger.error("Batch request %s failed: %s", result.get("custom_id"), result.get("error") or response)
+            continue
+        choices = (response.get("body") or {}).get("choices") or []
+        message = choices[0].get("message", {}) if choices else {}
+        answers[int(result["custom_id"])] = str(message.get("content") or "").strip()
+    return answers
+
+
+def wait_for_batch(client, batch_id: str, interval: float = BATCH_POLL_SECONDS):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in BATCH_FINAL_STATUSES:
+            return batch
+        logger.info("Batch %s is %s; checking again in %.0fs", batch_id, batch.status, interval)
+        time.sleep(interval)
+        interval = min(interval * 2, BATCH_MAX_POLL_SECONDS)
+
+
+def run_batch(client, samples: Sequence[Tuple[int, str, str, str]], model: str) -> Dict[int, str]:
+    upload = client.files.create(
+        file=("gpt_audit_batch.jsonl", build_batch_requests(samples, model).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+    logger.info("Submitted batch %s with %d requests", batch.id, len(samples))
+    batch = wait_for_batch(client, batch.id)
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} finished with status {batch.status}")
+    return parse_batch_output(client.files.content(batch.output_file_id).text)
+
+
+def _resolved(answer: str) -> Future:
+    response: Future = Future()
+    response.set_result(answer)
+    return response
+
+
+def _batch_responses(client, samples: Sequence[Tuple[int, str, str, str]], model: str) -> List[Future]:
+    # Wrap batch answers as resolved futures so main handles both modes with the same loop;
+    # a failed upload, submission or poll fails every sample, as a failed request does live.
+    try:
+        answers = run_batch(client, samples, model)
+        failure: Exception = RuntimeError("no result in batch output")
+    except BATCH_ERRORS as exc:
+        answers, failure = {}, exc
+    responses: List[Future] = []
+    for comment_id, _, _, _ in samples:
+        response: Future = Future()
+        if comment_id in answers:
+            response.set_result(answers[comment_id])
+        else:
+            response.set_exception(failure)
+        responses.append(response)
+    return responses
+
+
 def ensure_audit_columns(conn: sqlite3.Connection) -> None:
     required = {
         "audit_status": "TEXT",
@@ -122,18 +349,62 @@ def ensure_audit_columns(conn: sqlite3.Connection) -> None:
         "audit_notes": "TEXT",
     }
     cur = conn.execute("PRAGMA table_info(supervisor_comments)")
-    existing = {row[1] for row in cur.fetchall()}
+    existing = {row[1] for row in cur}
     for column, definition in required.items():
         if column not in existing:
             conn.execute(f"ALTER TABLE supervisor_comments ADD COLUMN {column} {definition}")
     conn.commit()
 
 
+def ensure_audit_cache(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS audit_cache (
+            prompt_hash BLOB NOT NULL,
+            model TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            PRIMARY KEY (prompt_hash, model)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.commit()
+
+
+def prompt_hash(prompt: str) -> bytes:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+
+
+def load_cached_answers(conn: sqlite3.Connection, model: str, keys: Iterable[bytes]) -> Dict[bytes, str]:
+    unique = list(dict.fromkeys(keys))
+    answers: Dict[bytes, str] = {}
+    for start in range(0, len(unique), SAMPLE_FETCH_CHUNK):
+        chunk = unique[start : start + SAMPLE_FETCH_CHUNK]
+        cursor = conn.execute(
+            f"""
+            SELECT prompt_hash, answer
+            FROM audit_cache
+            WHERE model = ? AND prompt_hash IN ({", ".join("?" for _ in chunk)})
+            """,
+            (model, *chunk),
+        )
+        answers.update(cursor)
+    return answers
+
+
+def store_cached_answers(conn: sqlite3.Connection, model: str, answers: Dict[bytes, str]) -> None:
+    # No commit here; callers commit alongside the audit results they belong to.
+    conn.executemany(
+        "INSERT OR REPLACE INTO audit_cache (prompt_hash, model, answer) VALUES (?, ?, ?)",
+        ((key, model, answer) for key, answer in answers.items()),
+    )
+
+
 def interpret_response(answer: str) -> Tuple[str, str]:
     cleaned = (answer or "").strip()
     if not cleaned:
         return "FLAG", "[no response]"
-    if cleaned.upper().startswith("PASS"):
+    # Upper-case only the first four characters rather than a copy of the whole reply.
+    if cleaned[:4].upper().startswith("PASS"):
         return "PASS", ""
     return "FLAG", cleaned
 
@@ -147,21 +418,26 @@ def record_audit_result(
     timestamp: Optional[str] = None,
 ) -> str:
     ts = timestamp or datetime.now(timezone.utc).isoformat()
-    conn.execute(
+    record_audit_results(conn, [(status, model, ts, notes, comment_id)])
+    return ts
+
+
+def record_audit_results(conn: sqlite3.Connection, results: Iterable[Tuple[str, str, str, str, int]]) -> None:
+    # results are (status, model, timestamp, notes, comment_id); one statement, one commit.
+    conn.executemany(
         """
         UPDATE supervisor_comments
         SET audit_status = ?, audit_model = ?, audit_timestamp = ?, audit_notes = ?
         WHERE id = ?
         """,
-        (status, model, ts, notes, comment_id),
+        results,
     )
     conn.commit()
-    return ts
 
 
 def main() -> None:
     args = parse_args()
-    connection = sqlite3.connect(Path(args.database).expanduser().resolve())
+    connection = connect_database(Path(args.database).expanduser().resolve())
     samples = fetch_samples(connection, "supervisor_comments", args.samples)
     if not samples:
         print("No supervisor comments found; nothing to audit.")
@@ -183,38 +459,84 @@ def main() -> None:
         print("The openai package is not installed; run `pip install -r requirements.txt` to enable audits.")
         return
 
+    if args.batch and client_kind != "chat_completions":
+        print("Batch mode needs the openai>=1.0 client; run `pip install -r requirements.txt`.")
+        return
+
     ensure_audit_columns(connection)
     model_name = args.model
     if client_kind == "legacy" and model_name == "gpt-4o-mini":
         logger.info("Legacy openai client detected; falling back to gpt-3.5-turbo")
         model_name = "gpt-3.5-turbo"
 
+    prompts = [build_prompt(diary_date, source_file, comment) for _, diary_date, source_file, comment in samples]
+    keys = [prompt_hash(prompt) for prompt in prompts]
+    cached: Dict[bytes, str] = {}
+    if not args.no_cache:
+        ensure_audit_cache(connection)
+    if not (args.no_cache or args.refresh_cache):
+        cached = load_cached_answers(connection, model_name, keys)
+    if cached:
+        print(f"Reusing {len(cached)} cached answer(s).")
+    # One request per distinct uncached prompt; samples sharing a prompt share its response.
+    pending: Dict[bytes, Tuple[Tuple[int, str, str, str], str]] = {}
+    for sample, prompt, key in zip(samples, prompts, keys):
+        if key not in cached:
+            pending.setdefault(key, (sample, prompt))
+    responses: Dict[bytes, Future] = {key: _resolved(answer) for key, answer in cached.items()}
+
     totals = {"audited": 0, "pass": 0, "flag": 0, "errors": 0}
-    for comment_id, diary_date, source_file, comment in samples:
-        prompt = build_prompt(diary_date, source_file, comment)
-        totals["audited"] += 1
-        try:
-            answer = _send_prompt(client_kind, client, model_name, prompt)
-        except Exception as exc:  # pragma: no cover - defensive logging
-            totals["errors"] += 1
-            logger.error("OpenAI request failed for %s on %s: %s", source_file, diary_date, exc)
-            continue
-        status, notes = interpret_response(answer)
-        try:
-            record_audit_result(connection, comment_id, status, model_name, notes)
-        except sqlite3.Error as exc:  # pragma: no cover - defensive logging
-            totals["errors"] += 1
-            logger.error("Failed to store audit result for %s on %s: %s", source_file, diary_date, exc)
-            continue
-        if status == "PASS":
-            totals["pass"] += 1
+    results: List[Tuple[str, str, str, str, int]] = []
+    new_answers: Dict[bytes, str] = {}
+    # Requests are network-bound, so keep several in flight; results are still handled in
+    # sample order on this thread, which owns the SQLite connection.
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        if args.batch:
+            if pending:
+                batch = _batch_responses(client, [sample for sample, _ in pending.values()], model_name)
+                responses.update(zip(pending, batch))
         else:
-            totals["flag"] += 1
-        print("-" * 40)
-        print(f"Entry {diary_date} :: {source_file}")
-        print(answer.strip() or "[no response]")
-        print(f"Audit status: {status}")
-
+            requests_bucket = TokenBucket(args.max_rpm) if args.max_rpm > 0 else None
+            tokens_bucket = TokenBucket(args.max_tpm) if args.max_tpm > 0 else None
+            for key, (_, prompt) in pending.items():
+                responses[key] = executor.submit(
+                    send_with_retry,
+                    client_kind,
+                    client,
+                    model_name,
+                    prompt,
+                    args.max_attempts,
+                    requests_bucket,
+                    tokens_bucket,
+                )
+        for (comment_id, diary_date, source_file, _), key in zip(samples, keys):
+            totals["audited"] += 1
+            try:
+                answer = responses[key].result()
+            except Exception as exc:
+                totals["errors"] += 1
+                logger.error("OpenAI request failed for %s on %s: %s", source_file, diary_date, exc)
+                continue
+            if key in pending and not args.no_cache:
+                new_answers[key] = answer
+            status, notes = interpret_response(answer)
+            results.append((status, model_name, datetime.now(timezone.utc).isoformat(), notes, comment_id))
+            print("-" * 40)
+            print(f"Entry {diary_date} :: {source_file}")
+            print(answer.strip() or "[no response]")
+            print(f"Audit status: {status}")
+
+    try:
+        # store_cached_answers leaves the commit to record_audit_results, so both land together.
+        if new_answers:
+            store_cached_answers(connection, model_name, new_answers)
+        record_audit_results(connection, results)
+    except sqlite3.Error as exc:  # pragma: no cover - defensive logging
+        totals["errors"] += len(results)
+        logger.error("Failed to store %d audit results: %s", len(results), exc)
+    else:
+        totals["pass"] += sum(1 for result in results if result[0] == "PASS")
+        totals["flag"] += sum(1 for result in results if result[0] != "PASS")
     print(
         "Audit summary: audited {audited}, PASS {pass}, FLAG {flag}, errors {errors}".format(
             **totals
@@ -12,13 +12,12 @@ from __future__ import annotations
 
 import argparse
 import csv
-import re
 from dataclasses import dataclass
 from datetime import date, datetime
+from functools import partial
+from itertools import chain
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set
-
-from openpyxl import load_workbook
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
 
 import build_diary_database as diary
 
@@ -93,21 +92,21 @@ def main() -> None:
             "worksheet",
         ],
         (
-            {
-                "diary_date": entry.diary_date.isoformat(),
-                "worker_or_group": entry.label,
-                "hours": entry.hours if entry.hours is not None else "",
-                "machine": entry.machine,
-                "start_smu": entry.start_smu,
-                "end_smu": entry.end_smu,
-                "machine_hours": entry.machine_hours,
-                "location": entry.location,
-                "activity": entry.activity,
-                "material": entry.material,
-                "comment": entry.comment,
-                "source_file": entry.source_file,
-                "worksheet": entry.worksheet,
-            }
+            (
+                entry.diary_date.isoformat(),
+                entry.label,
+                entry.hours if entry.hours is not None else "",
+                entry.machine,
+                entry.start_smu,
+                entry.end_smu,
+                entry.machine_hours,
+                entry.location,
+                entry.activity,
+                entry.material,
+                entry.comment,
+                entry.source_file,
+                entry.worksheet,
+            )
             for entry in supervisor_comments
         ),
     )
@@ -116,12 +115,7 @@ def main() -> None:
         output_dir / "supervisor_daily_extension.csv",
         ["diary_date", "note", "source_file", "worksheet"],
         (
-            {
-                "diary_date": entry.diary_date.isoformat(),
-                "note": entry.note,
-                "source_file": entry.source_file,
-                "worksheet": entry.worksheet,
-            }
+            (entry.diary_date.isoformat(), entry.note, entry.source_file, entry.worksheet)
             for entry in extension_notes
         ),
     )
@@ -130,12 +124,7 @@ def main() -> None:
         output_dir / "client_fallback_production.csv",
         ["diary_date", "activity_text", "source_file", "worksheet"],
         (
-            {
-                "diary_date": entry.diary_date.isoformat(),
-                "activity_text": entry.text,
-                "source_file": entry.source_file,
-                "worksheet": entry.worksheet,
-            }
+            (entry.diary_date.isoformat(), entry.text, entry.source_file, entry.worksheet)
             for entry in client_fallback
         ),
     )
@@ -156,61 +145,65 @@ def parse_supervisor_reports(
     extension_notes: List[ExtensionNote] = []
     dates: Set[date] = set()
 
-    for workbook_path in sorted(supervisor_dir.rglob("*.xlsx")):
-        if workbook_path.name.startswith("~$"):
-            continue
-        try:
-            workbook = load_workbook(workbook_path, read_only=True, data_only=True)
-        except Exception as exc:
-            print(f"Failed to open {workbook_path}: {exc}")
-            continue
-        relative = str(_safe_relative(workbook_path, root))
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            rows = list(diary.iter_sheet_rows(worksheet))
-            if not rows:
-                continue
-            diary_date = diary.extract_diary_date(rows)
-            if diary_date is None:
-                continue
-            dates.add(diary_date)
-            comments.extend(extract_supervisor_comments(worksheet, diary_date, relative, sheet_name))
-            extension_notes.extend(extract_extension_notes(worksheet, diary_date, relative, sheet_name))
+    files = diary.iter_excel_files(supervisor_dir)
+    for file_comments, file_notes, file_dates in diary.map_files(partial(_parse_supervisor_file, root=root), files):
+        comments.extend(file_comments)
+        extension_notes.extend(file_notes)
+        dates.update(file_dates)
     comments.sort(key=lambda entry: (entry.diary_date, entry.label))
     extension_notes.sort(key=lambda entry: (entry.diary_date, entry.note))
     return comments, extension_notes, dates
 
 
+def _parse_supervisor_file(
+    workbook_path: Path, root: Path
+) -> Tuple[List[SupervisorComment], List[ExtensionNote], List[date]]:
+    comments: List[SupervisorComment] = []
+    extension_notes: List[ExtensionNote] = []
+    dates: List[date] = []
+    try:
+        sheets = diary.read_workbook_sheets(workbook_path)
+    except Exception as exc:
+        print(f"Failed to open {workbook_path}: {exc}")
+        return comments, extension_notes, dates
+    relative = str(_safe_relative(workbook_path, root))
+    for sheet_name, values in sheets:
+        diary_date = diary.extract_diary_date(diary.iter_value_rows(values))
+        if diary_date is None:
+            continue
+        dates.append(diary_date)
+        comments.extend(extract_supervisor_comments(values, diary_date, relative, sheet_name))
+        extension_notes.extend(extract_extension_notes(values, diary_date, relative, sheet_name))
+    return comments, extension_notes, dates
+
+
 def extract_supervisor_comments(
-    worksheet, diary_date: date, source_file: str, sheet_name: str
+    values: Iterable[Sequence[Optional[object]]], diary_date: date, source_file: str, sheet_name: str
 ) -> List[SupervisorComment]:
     entries: List[SupervisorComment] = []
-    header_row_seen = False
-    for row_index in range(1, worksheet.max_row + 1):
-        if not header_row_seen:
-            hours_header = _text(worksheet.cell(row_index, 3).value)
-            machine_header = _text(worksheet.cell(row_index, 4).value)
-            if hours_header.lower() == "hours" and machine_header.lower() == "machine":
-                header_row_seen = True
-            continue
-        label = _text(worksheet.cell(row_index, 2).value)
+    rows = iter(values)
+    for row in rows:
+        if _text(_cell(row, 2)).lower() == "hours" and _text(_cell(row, 3)).lower() == "machine":
+            break
+    for row in rows:
+        label = _text(_cell(row, 1))
         upper_label = label.upper()
         if _should_stop_labour_section(upper_label):
             break
-        comment = _text(worksheet.cell(row_index, 11).value)
+        comment = _text(_cell(row, 10))
         if not comment:
             continue
         entry = SupervisorComment(
             diary_date=diary_date,
             label=label,
-            hours=_to_float(worksheet.cell(row_index, 3).value),
-            machine=_text(worksheet.cell(row_index, 4).value),
-            start_smu=_text(worksheet.cell(row_index, 5).value),
-            end_smu=_text(worksheet.cell(row_index, 6).value),
-            machine_hours=_text(worksheet.cell(row_index, 7).value),
-            location=_text(worksheet.cell(row_index, 8).value),
-            activity=_text(worksheet.cell(row_index, 9).value),
-            material=_text(worksheet.cell(row_index, 10).value),
+            hours=_to_float(_cell(row, 2)),
+            machine=_text(_cell(row, 3)),
+            start_smu=_text(_cell(row, 4)),
+            end_smu=_text(_cell(row, 5)),
+            machine_hours=_text(_cell(row, 6)),
+            location=_text(_cell(row, 7)),
+            activity=_text(_cell(row, 8)),
+            material=_text(_cell(row, 9)),
             comment=comment,
             source_file=source_file,
             worksheet=sheet_name,
@@ -220,76 +213,75 @@ def extract_supervisor_comments(
 
 
 def extract_extension_notes(
-    worksheet, diary_date: date, source_file: str, sheet_name: str
+    values: Iterable[Sequence[Optional[object]]], diary_date: date, source_file: str, sheet_name: str
 ) -> List[ExtensionNote]:
-    start_row = None
-    end_row = None
-    for row_index in range(1, worksheet.max_row + 1):
-        row_text = _row_text(worksheet, row_index).lower()
-        if start_row is None and "daily work extension" in row_text:
-            start_row = row_index + 1
-            continue
-        if start_row is not None and "daily work photos" in row_text:
-            end_row = row_index
-            break
-    if start_row is None or end_row is None or start_row >= end_row:
-        return []
     notes: List[ExtensionNote] = []
-    for row_index in range(start_row, end_row):
-        note_text = _row_text(worksheet, row_index)
-        if not note_text:
+    in_section = False
+    for row in values:
+        row_text = _row_text(row)
+        if not in_section:
+            in_section = "daily work extension" in row_text.lower()
+            continue
+        if "daily work photos" in row_text.lower():
+            return notes
+        if not row_text:
             continue
         notes.append(
             ExtensionNote(
                 diary_date=diary_date,
-                note=note_text,
+                note=row_text,
                 source_file=source_file,
                 worksheet=sheet_name,
             )
         )
-    return notes
+    return []
 
 
 def parse_client_reports(
     client_dir: Path, root: Path, supervisor_dates: Set[date]
 ) -> List[ClientActivity]:
     activities: List[ClientActivity] = []
-    for workbook_path in sorted(client_dir.rglob("*.xlsx")):
-        if workbook_path.name.startswith("~$"):
+    files = diary.iter_excel_files(client_dir)
+    for file_activities in diary.map_files(partial(_parse_client_file, root=root), files):
+        activities.extend(entry for entry in file_activities if entry.diary_date not in supervisor_dates)
+    activities.sort(key=lambda entry: (entry.diary_date, entry.text))
+    return activities
+
+
+def _parse_client_file(workbook_path: Path, root: Path) -> List[ClientActivity]:
+    activities: List[ClientActivity] = []
+    try:
+        sheets = diary.read_workbook_sheets(workbook_path)
+    except Exception as exc:
+        print(f"Failed to open {workbook_path}: {exc}")
+        return activities
+    relative = str(_safe_relative(workbook_path, root))
+    for sheet_name, values in sheets:
+        rows = diary.iter_value_rows(values)
+        first_row = next(rows, None)
+        if first_row is None:
             continue
-        try:
-            workbook = load_workbook(workbook_path, read_only=True, data_only=True)
-        except Exception as exc:
-            print(f"Failed to open {workbook_path}: {exc}")
+        sections = diary.parse_client_rows(chain((first_row,), rows))
+        diary_date = sections.diary_date
+        if diary_date is None:
             continue
-        relative = str(_safe_relative(workbook_path, root))
-        for sheet_name in workbook.sheetnames:
-            worksheet = workbook[sheet_name]
-            rows = list(diary.iter_sheet_rows(worksheet))
-            if not rows:
-                continue
-            diary_date = diary.extract_diary_date(rows)
-            if diary_date is None or diary_date in supervisor_dates:
-                continue
-            for text in diary.extract_activities(rows):
-                activities.append(
-                    ClientActivity(
-                        diary_date=diary_date,
-                        text=text,
-                        source_file=relative,
-                        worksheet=sheet_name,
-                    )
+        for text in sections.activities:
+            activities.append(
+                ClientActivity(
+                    diary_date=diary_date,
+                    text=text,
+                    source_file=relative,
+                    worksheet=sheet_name,
                 )
-    activities.sort(key=lambda entry: (entry.diary_date, entry.text))
+            )
     return activities
 
 
-def write_csv(path: Path, headers: Sequence[str], rows: Iterable[Dict[str, object]]) -> None:
+def write_csv(path: Path, headers: Sequence[str], rows: Iterable[Sequence[object]]) -> None:
     with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=headers)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
+        writer = csv.writer(handle)
+        writer.writerow(headers)
+        writer.writerows(rows)
 
 
 def _text(value: Optional[object]) -> str:
@@ -297,44 +289,39 @@ def _text(value: Optional[object]) -> str:
         return ""
     if isinstance(value, (datetime, date)):
         return value.isoformat()
-    return re.sub(r"\s+", " ", str(value).replace("\xa0", " ")).strip()
+    return " ".join(str(value).split())
 
 
-def _row_text(worksheet, row_index: int) -> str:
+def _row_text(row: Sequence[Optional[object]]) -> str:
     parts: List[str] = []
-    for cell in worksheet[row_index]:
-        text = _text(cell.value)
+    for value in row:
+        text = _text(value)
         if text:
             parts.append(text)
     return " | ".join(parts)
 
 
+def _cell(row: Sequence[Optional[object]], index: int) -> Optional[object]:
+    return row[index] if index < len(row) else None
+
+
 def _to_float(value: Optional[object]) -> Optional[float]:
     if value is None:
         return None
     if isinstance(value, (int, float)):
         return float(value)
+    text = value.strip() if isinstance(value, str) else str(value).strip()
+    # Labels such as "Day shift" can't be numbers; skip float() and its ValueError for them.
+    if not text or text[0] in diary.NON_NUMBER_START_CHARS:
+        return None
     try:
-        text = str(value).strip()
-        if not text:
-            return None
         return float(text)
-    except (TypeError, ValueError):
+    except ValueError:
         return None
 
 
 def _should_stop_labour_section(label_upper: str) -> bool:
-    if not label_upper:
-        return False
-    stop_markers = [
-        "PLANT NOT",
-        "PLANNED WORKS",
-        "INCIDENTS",
-        "COMMUNICATIONS",
-        "DAILY WORK EXTENSION",
-        "DAILY WORK PHOTOS",
-    ]
-    return any(marker in label_upper for marker in stop_markers)
+    return diary.LABOUR_STOP_RE.search(label_upper) is not None
 
 
 def _safe_relative(path: Path, root: Path) -> Path:
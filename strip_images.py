@@ -5,61 +5,240 @@ Creates cleaned versions of files that exceed GitHub's 100MB limit.
 """
 
 import os
+import posixpath
 import shutil
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
-from openpyxl import load_workbook
-from openpyxl.drawing.image import Image
+
+MAX_WORKERS = 4
+PACKAGE_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+DOC_RELS_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+DRAWING_NS = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+DRAWINGML_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+IMAGE_REL_TYPE = DOC_RELS_NS + "/image"
+ANCHOR_TAGS = {f"{{{DRAWING_NS}}}{tag}" for tag in ("twoCellAnchor", "oneCellAnchor", "absoluteAnchor")}
+# ElementTree keeps prefixes in a process-wide registry, so serialising is one file at a time
+_SERIALIZE_LOCK = threading.Lock()
 
 def get_file_size_mb(filepath):
     """Get file size in MB."""
     return os.path.getsize(filepath) / (1024 * 1024)
 
-def strip_images_from_excel(input_path, output_path=None):
+def _rels_owner(rels_name):
+    """Return the part a .rels file describes, e.g. xl/worksheets/sheet1.xml."""
+    folder, _, filename = rels_name.rpartition("_rels/")
+    return folder + filename[: -len(".rels")]
+
+
+def _resolve_target(rels_name, relationship):
+    """Return the zip member a relationship points at, or None for external targets."""
+    if relationship.get("TargetMode") == "External":
+        return None
+    target = relationship.get("Target", "")
+    if target.startswith("/"):
+        return target[1:]
+    base = posixpath.dirname(_rels_owner(rels_name))
+    return posixpath.normpath(posixpath.join(base, target))
+
+
+def _parse_xml(data):
+    """Parse an XML part, returning its root and every namespace it declares."""
+    namespaces = {}
+    for _, (prefix, uri) in ET.iterparse(BytesIO(data), events=("start-ns",)):
+        namespaces.setdefault(prefix, uri)
+    return ET.fromstring(data), namespaces
+
+
+def _serialize_xml(root, namespaces):
+    """Serialise a parsed part with its original prefixes and namespace declarations.
+
+    Excel's mc:Ignorable attribute names prefixes, so declarations ElementTree would
+    drop as unused are written back onto the root element.
+    """
+    registered = {}
+    with _SERIALIZE_LOCK:
+        for prefix, uri in namespaces.items():
+            try:
+                ET.register_namespace(prefix, uri)
+            except ValueError:
+                continue  # reserved ns0-style prefix; ElementTree generates its own
+            registered[prefix] = uri
+        data = ET.tostring(root, encoding="UTF-8", xml_declaration=True)
+    head, sep, tail = data.partition(b"?>")
+    root_end = tail.index(b">")
+    start_tag = tail[:root_end].decode("utf-8")
+    missing = "".join(
+        f' xmlns{":" + prefix if prefix else ""}="{uri}"'
+        for prefix, uri in registered.items()
+        if f'xmlns{":" + prefix if prefix else ""}=' not in start_tag
+    )
+    if start_tag.endswith("/"):
+        start_tag = start_tag[:-1] + missing + "/"
+    else:
+        start_tag += missing
+    return head + sep + start_tag.encode("utf-8") + tail[root_end:]
+
+
+def _referenced_ids(root):
+    """Return every relationship id an XML part still refers to."""
+    prefix = f"{{{DOC_RELS_NS}}}"
+    return {
+        value
+        for element in root.iter()
+        for name, value in element.attrib.items()
+        if name.startswith(prefix)
+    }
+
+
+def _remove_image_references(root, image_ids):
+    """Remove the elements of a part that only exist to show one of image_ids.
+
+    Pictures are removed with their anchor (or just the picture inside a group), sheet
+    background pictures are removed, and image fills lose their blip. Charts, shapes
+    and everything else stay.
+    """
+    embed = f"{{{DOC_RELS_NS}}}embed"
+    link = f"{{{DOC_RELS_NS}}}link"
+    parents = {child: parent for parent in root.iter() for child in parent}
+    for picture in list(root.iter(f"{{{DRAWING_NS}}}pic")):
+        blips = list(picture.iter(f"{{{DRAWINGML_NS}}}blip"))
+        if not blips or any(blip.get(embed) not in image_ids for blip in blips):
+            continue
+        parent = parents[picture]
+        if parent.tag in ANCHOR_TAGS and parents.get(parent) is root:
+            root.remove(parent)
+        elif parent.tag == f"{{{DRAWING_NS}}}grpSp":
+            parent.remove(picture)
+    for picture in list(root.iter(f"{{{SHEET_NS}}}picture")):
+        if picture.get(f"{{{DOC_RELS_NS}}}id") in image_ids:
+            parents[picture].remove(picture)
+    for blip in list(root.iter(f"{{{DRAWINGML_NS}}}blip")):
+        if blip in parents and (blip.get(embed) in image_ids or blip.get(link) in image_ids):
+            parents[blip].remove(blip)
+
+
+def strip_images_from_excel(input_path, output_path=None, log=print):
     """
     Remove all images from an Excel file.
     If output_path is None, overwrites the original file.
+    Progress lines go to log, so parallel callers can print them per file.
+
+    Works on the xlsx zip directly: image relationships are removed together with the
+    pictures that use them, media nothing else references is dropped, and every other
+    member is copied through unchanged. Charts and shapes stay. Pictures in legacy VML
+    parts (header and footer images) are left alone.
     """
     if output_path is None:
         output_path = input_path
     
-    print(f"Processing: {input_path}")
+    log(f"Processing: {input_path}")
     original_size = get_file_size_mb(input_path)
-    print(f"  Original size: {original_size:.2f} MB")
-    
-    # Load workbook
-    wb = load_workbook(input_path)
+    log(f"  Original size: {original_size:.2f} MB")
     
-    images_removed = 0
-    # Remove images from all sheets
-    for sheet in wb.worksheets:
-        if hasattr(sheet, '_images') and sheet._images:
-            images_removed += len(sheet._images)
-            sheet._images = []
-    
-    # Save cleaned workbook
-    wb.save(output_path)
+    with zipfile.ZipFile(input_path) as zin:
+        names = zin.namelist()
+        patched = {}
+        kept_targets = set()
+        images_removed = 0
+        for rels_name in (name for name in names if name.endswith(".rels")):
+            rels_root, rels_namespaces = _parse_xml(zin.read(rels_name))
+            relationships = list(rels_root.iter(f"{{{PACKAGE_RELS_NS}}}Relationship"))
+            image_ids = {rel.get("Id") for rel in relationships if rel.get("Type") == IMAGE_REL_TYPE}
+            owner = _rels_owner(rels_name)
+            removed = set()
+            if image_ids and owner.endswith(".xml") and owner in names:
+                owner_root, owner_namespaces = _parse_xml(zin.read(owner))
+                _remove_image_references(owner_root, image_ids)
+                # Anything the part still points at keeps its relationship
+                removed = image_ids - _referenced_ids(owner_root)
+                if removed:
+                    patched[owner] = _serialize_xml(owner_root, owner_namespaces)
+                    for rel in relationships:
+                        if rel.get("Id") in removed:
+                            rels_root.remove(rel)
+                    patched[rels_name] = _serialize_xml(rels_root, rels_namespaces)
+                    images_removed += len(removed)
+            kept_targets.update(
+                _resolve_target(rels_name, rel) for rel in relationships if rel.get("Id") not in removed
+            )
+        
+        # Media still referenced from a kept part (charts, headers, backgrounds) stays
+        dropped = {name for name in names if name.startswith("xl/media/") and name not in kept_targets}
+        
+        if dropped and "[Content_Types].xml" in names:
+            types_root, types_namespaces = _parse_xml(zin.read("[Content_Types].xml"))
+            for override in list(types_root.iter(f"{{{CONTENT_TYPES_NS}}}Override")):
+                if override.get("PartName", "").lstrip("/") in dropped:
+                    types_root.remove(override)
+            patched["[Content_Types].xml"] = _serialize_xml(types_root, types_namespaces)
+        
+        # Write next to the target and swap in, so overwriting the input is safe
+        output_path = Path(output_path)
+        fd, temp_name = tempfile.mkstemp(suffix=".xlsx", dir=output_path.parent)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(temp_name, "w", zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    if info.filename in dropped:
+                        continue
+                    if info.filename in patched:
+                        zout.writestr(info, patched[info.filename])
+                        continue
+                    with zin.open(info) as src, zout.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst)
+            os.replace(temp_name, output_path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
     
     new_size = get_file_size_mb(output_path)
-    print(f"  New size: {new_size:.2f} MB")
-    print(f"  Images removed: {images_removed}")
-    print(f"  Space saved: {original_size - new_size:.2f} MB")
+    log(f"  New size: {new_size:.2f} MB")
+    log(f"  Images removed: {images_removed}")
+    log(f"  Space saved: {original_size - new_size:.2f} MB")
     
     return new_size
 
 def find_large_excel_files(root_dir, size_limit_mb=50):
     """Find Excel files larger than size_limit_mb."""
     large_files = []
-    root_path = Path(root_dir)
+    limit_bytes = size_limit_mb * 1024 * 1024
     
-    for excel_file in root_path.rglob("*.xlsx"):
-        if excel_file.name.startswith("~$"):  # Skip temp files
+    # os.scandir walk: names are filtered before any Path is built, and the size
+    # comes from the directory entry instead of a second os.path.getsize call.
+    pending = [str(root_dir)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith(".xlsx") and not entry.name.startswith("~$"):  # Skip temp files
+                        size = entry.stat().st_size
+                        if size > limit_bytes:
+                            large_files.append((Path(entry.path), size / (1024 * 1024)))
+        except OSError:
             continue
-        size_mb = get_file_size_mb(excel_file)
-        if size_mb > size_limit_mb:
-            large_files.append((excel_file, size_mb))
     
     return sorted(large_files, key=lambda x: x[1], reverse=True)
 
+def _strip_file(filepath):
+    """Strip one file and return its progress lines instead of printing them."""
+    lines = []
+    try:
+        new_size = strip_images_from_excel(filepath, log=lines.append)
+        if new_size > 100:
+            lines.append(f"  WARNING: Still over 100 MB limit!")
+    except Exception as e:
+        lines.append(f"  ERROR: {e}")
+    return lines
+
 def main():
     root_dir = Path(__file__).parent
     
@@ -81,14 +260,11 @@ def main():
     print("Stripping images from large files...")
     print("=" * 60 + "\n")
     
-    for filepath, size in large_files:
-        try:
-            new_size = strip_images_from_excel(filepath)
-            if new_size > 100:
-                print(f"  WARNING: Still over 100 MB limit!")
-        except Exception as e:
-            print(f"  ERROR: {e}")
-        print()
+    # zlib releases the GIL, so threads overlap the (de)compression of separate files
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(large_files))) as executor:
+        for lines in executor.map(_strip_file, [filepath for filepath, _ in large_files]):
+            print("\n".join(lines))
+            print()
     
     print("=" * 60)
     print("Done! Files have been cleaned.")
@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import build_diary_database as bdb
+
+# Test databases are throwaway, so skip durability: no fsync and no WAL/-shm files.
+TEST_PRAGMAS = (
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -20000",
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_sqlite(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(bdb, "INGEST_PRAGMAS", TEST_PRAGMAS)
@@ -1,14 +1,20 @@
+import io
+import json
+import sqlite3
 import sys
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+import build_diary_database as diary
 import dedupe_diary_entries as dedupe
+import generate_daily_report as report
 import parse_daily_reports as pdr
 
 
@@ -39,6 +45,15 @@ def _create_client_workbook(
     wb.save(path)
 
 
+def _add_undated_sheets(path: Path) -> None:
+    wb = load_workbook(path)
+    wb.create_sheet("Sheet2")
+    notes = wb.create_sheet("Notes")
+    notes.append(["", "Site notes"])
+    notes.append(["", "Nothing dated here"])
+    wb.save(path)
+
+
 def _create_supervisor_workbook(
     path: Path,
     diary_date: datetime,
@@ -105,6 +120,10 @@ def test_dedupe_annotations_flag_single_and_multi_source(tmp_path: Path) -> None
     activities, personnel, date_sources, errors = dedupe.gather_entries(tmp_path)
     assert not errors
     assert len(date_sources[diary_date.date()]) == 2
+    # Two files go through map_files' process pool; the results match a serial parse.
+    files = diary.iter_excel_files(tmp_path)
+    serial = [dedupe._gather_file_entries(path, tmp_path) for path in files]
+    assert list(diary.map_files(partial(dedupe._gather_file_entries, root=tmp_path), files)) == serial
 
     activity_rows, activity_summary = dedupe.annotate_activity_entries(activities, date_sources)
     activity_map = {row["activity_text"]: row for row in activity_summary}
@@ -124,6 +143,52 @@ def test_dedupe_annotations_flag_single_and_multi_source(tmp_path: Path) -> None
     assert solo_row["unique_to_source"] is True
 
 
+def test_client_parsers_skip_empty_and_undated_sheets(tmp_path: Path) -> None:
+    client_dir = tmp_path / "001-Client reports"
+    client_dir.mkdir()
+    workbook_path = client_dir / "client.xlsx"
+    _create_client_workbook(
+        workbook_path,
+        datetime(2025, 5, 8),
+        personnel_rows=[["Crew", "Lead", 8, "", "", "", "", "", ""]],
+        activities=["Pour slab"],
+    )
+    _add_undated_sheets(workbook_path)
+
+    fallback = pdr.parse_client_reports(client_dir, tmp_path, set())
+    assert [(entry.worksheet, entry.text) for entry in fallback] == [("001", "Pour slab")]
+
+    activities, _, date_sources, errors = dedupe.gather_entries(client_dir)
+    assert [entry.activity for entry in activities] == ["Pour slab"]
+    assert list(date_sources) == [datetime(2025, 5, 8).date()]
+    assert errors == ["Skipping client.xlsx::Notes (no diary date found)"]
+
+
+def test_dedupe_reports_undated_sheet_without_collecting_it(tmp_path: Path) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Template"
+    ws.append(["", "PRODUCTION (CONSTRUCTION STATUS & PROGRESS)"])
+    ws.append(["", "Placeholder activity"])
+    ws.append(["", "PHOTOS"])
+    wb.save(tmp_path / "template.xlsx")
+
+    activities, personnel, date_sources, errors = dedupe.gather_entries(tmp_path)
+
+    assert errors == ["Skipping template.xlsx::Template (no diary date found)"]
+    assert activities == [] and personnel == [] and not date_sources
+
+
+def test_dedupe_write_csv_matches_dict_writer(tmp_path: Path) -> None:
+    single = tmp_path / "single.csv"
+    dedupe.write_csv(single, ["activity_text"], [{"activity_text": "Form footings"}])
+    assert single.read_text(encoding="utf-8").splitlines() == ["activity_text", "Form footings"]
+
+    missing = tmp_path / "missing.csv"
+    dedupe.write_csv(missing, ["diary_date", "status"], [{"diary_date": "2025-05-01"}])
+    assert missing.read_text(encoding="utf-8").splitlines() == ["diary_date,status", "2025-05-01,"]
+
+
 def test_parse_supervisor_reports_extracts_comments_and_notes(tmp_path: Path) -> None:
     supervisor_dir = tmp_path / "002-Supervisor_Reports"
     supervisor_dir.mkdir()
@@ -171,6 +236,43 @@ def test_parse_supervisor_reports_extracts_comments_and_notes(tmp_path: Path) ->
     assert all(entry.source_file.endswith("supervisor.xlsx") for entry in comments)
 
 
+def test_parse_supervisor_reports_across_files_in_worker_pool(tmp_path: Path) -> None:
+    supervisor_dir = tmp_path / "002-Supervisor_Reports"
+    supervisor_dir.mkdir()
+    diary_dates = [datetime(2025, 5, day) for day in (5, 6, 7)]
+    for diary_date in diary_dates:
+        _create_supervisor_workbook(
+            supervisor_dir / f"supervisor_{diary_date.day}.xlsx",
+            diary_date,
+            labour_rows=[
+                {
+                    "label": "Worker One",
+                    "hours": 8,
+                    "machine": "Excavator",
+                    "start_smu": 1,
+                    "end_smu": 2,
+                    "machine_hours": 1,
+                    "location": "North cut",
+                    "activity": "Dig",
+                    "material": "Soil",
+                    "comment": f"Trenching day {diary_date.day}",
+                }
+            ],
+            extension_notes=[f"Compaction day {diary_date.day}"],
+        )
+    files = diary.iter_excel_files(supervisor_dir)
+    assert len(files) >= 2  # map_files only uses the process pool for two or more files
+
+    comments, notes, dates = pdr.parse_supervisor_reports(supervisor_dir, tmp_path)
+    assert dates == {diary_date.date() for diary_date in diary_dates}
+    assert [entry.comment for entry in comments] == ["Trenching day 5", "Trenching day 6", "Trenching day 7"]
+    assert [note.note for note in notes] == ["Compaction day 5", "Compaction day 6", "Compaction day 7"]
+
+    # The pooled results match a serial parse, file by file.
+    serial = [pdr._parse_supervisor_file(path, tmp_path) for path in files]
+    assert list(diary.map_files(partial(pdr._parse_supervisor_file, root=tmp_path), files)) == serial
+
+
 def test_parse_client_reports_skips_supervisor_dates(tmp_path: Path) -> None:
     client_dir = tmp_path / "001-Client reports"
     client_dir.mkdir()
@@ -196,3 +298,48 @@ def test_parse_client_reports_skips_supervisor_dates(tmp_path: Path) -> None:
     entries = pdr.parse_client_reports(client_dir, tmp_path, {date_with_supervisor.date()})
     assert [entry.diary_date for entry in entries] == [date_without_supervisor.date(), date_without_supervisor.date()]
     assert [entry.text for entry in entries] == ["Pour slab", "Strip forms"]
+
+
+def test_build_day_records_groups_rows_by_date(tmp_path: Path) -> None:
+    db_path = tmp_path / "diary.sqlite"
+    db = diary.DiaryDatabase(db_path, reset=False)
+    db.insert_activity("2025-05-02", "Strip forms", "b.xlsx", "001")
+    db.insert_activity("2025-05-02", "Pour slab", "a.xlsx", "001")
+    db.insert_activity("2025-05-03", "Backfill", "a.xlsx", "001")
+    db.insert_person("2025-05-03", "Team A", "Alice", "Lead", 8, "a.xlsx", "001")
+    db.commit()
+    db.conn.close()
+
+    conn = sqlite3.connect(db_path)
+    days = report.build_day_records(conn, ["2025-05-02", "2025-05-03", "2025-05-04"])
+    discovered = report.build_day_records(conn)
+    conn.close()
+
+    assert [day["diary_date"] for day in discovered] == ["2025-05-02", "2025-05-03"]
+    assert discovered == days[:2]
+    buffer = io.StringIO()
+    summaries = report.write_day_records(buffer, iter(days))
+    assert buffer.getvalue() == json.dumps(days, indent=2)
+    assert [summary["activities"] for summary in summaries] == [2, 1, 0]
+
+    assert [day["diary_date"] for day in days] == ["2025-05-02", "2025-05-03", "2025-05-04"]
+    assert [row["activity"] for row in days[0]["activities"]] == ["Pour slab", "Strip forms"]
+    assert days[0]["personnel"] == []
+    assert [row["name"] for row in days[1]["personnel"]] == ["Alice"]
+    assert days[2]["activities"] == [] and days[2]["fallback_activities"] == []
+
+
+def _float_or_none(text: str):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def test_number_parsers_keep_float_semantics_for_text_cells() -> None:
+    # The label fast path must not change what float() would have returned.
+    cells = ["8", " 7.5 ", "-2", "+.5", "1e3", "1,250", ",5", "inf", "-Infinity", "NaN", "nan", "٣", "８",
+             "8 hrs", "N/A", "Nil", "Day shift", "Name", "", "  ", "(3)", "_1"]
+    for cell in cells:
+        assert repr(pdr._to_float(cell)) == repr(_float_or_none(cell.strip() or "x")), cell
+        assert repr(diary._to_number(cell)) == repr(_float_or_none(cell.strip().replace(",", "") or "x")), cell
@@ -1,15 +1,31 @@
+import json
 import sqlite3
+import sys
 from datetime import date
 from pathlib import Path
 
-from gpt_audit import ensure_audit_columns, interpret_response, record_audit_result, _send_prompt
+import pytest
+
+import gpt_audit
+from gpt_audit import (
+    build_batch_requests,
+    ensure_audit_cache,
+    ensure_audit_columns,
+    interpret_response,
+    load_cached_answers,
+    parse_batch_output,
+    prompt_hash,
+    record_audit_result,
+    send_with_retry,
+    store_cached_answers,
+    _send_prompt,
+)
 
 import build_diary_database as bdb
 
 
-def test_ensure_audit_columns_adds_missing(tmp_path: Path) -> None:
-    db_path = tmp_path / "legacy.sqlite"
-    conn = sqlite3.connect(db_path)
+def test_ensure_audit_columns_adds_missing() -> None:
+    conn = sqlite3.connect(":memory:")
     conn.execute(
         """
         CREATE TABLE supervisor_comments (
@@ -29,9 +45,8 @@ def test_ensure_audit_columns_adds_missing(tmp_path: Path) -> None:
         assert expected in columns
 
 
-def test_record_audit_result_updates_row(tmp_path: Path) -> None:
-    db_path = tmp_path / "audit.sqlite"
-    db = bdb.DiaryDatabase(db_path, reset=True)
+def test_record_audit_result_updates_row() -> None:
+    db = bdb.DiaryDatabase(Path(":memory:"))
     record = bdb.SupervisorCommentRecord(
         diary_date=date(2025, 5, 1),
         label="Worker One",
@@ -50,7 +65,7 @@ def test_record_audit_result_updates_row(tmp_path: Path) -> None:
     db.insert_supervisor_comment(record)
     db.commit()
 
-    conn = sqlite3.connect(db_path)
+    conn = db.conn
     comment_id = conn.execute("SELECT id FROM supervisor_comments").fetchone()[0]
     ensure_audit_columns(conn)
     record_audit_result(conn, comment_id, "PASS", "gpt-test", "", timestamp="2025-01-01T00:00:00Z")
@@ -66,6 +81,65 @@ def test_record_audit_result_updates_row(tmp_path: Path) -> None:
     assert row == ("PASS", "gpt-test", "2025-01-01T00:00:00Z", "")
 
 
+def test_audit_cache_is_keyed_by_prompt_and_model() -> None:
+    conn = sqlite3.connect(":memory:")
+    ensure_audit_cache(conn)
+    same, other = prompt_hash("prompt one"), prompt_hash("prompt two")
+    assert same == prompt_hash("prompt one")
+    store_cached_answers(conn, "gpt-test", {same: "PASS"})
+    conn.commit()
+
+    assert load_cached_answers(conn, "gpt-test", [same, other, same]) == {same: "PASS"}
+    assert load_cached_answers(conn, "gpt-other", [same]) == {}
+
+
+def test_main_cache_flags_control_reuse_and_storage(tmp_path: Path, monkeypatch) -> None:
+    db_path = tmp_path / "audit.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE supervisor_comments (id INTEGER PRIMARY KEY, diary_date TEXT, source_file TEXT, comment TEXT)")
+    conn.executemany(
+        "INSERT INTO supervisor_comments (diary_date, source_file, comment) VALUES (?, ?, ?)",
+        [("2025-05-01", "a.xlsx", "Trenching"), ("2025-05-02", "b.xlsx", "Backfill")],
+    )
+    conn.commit()
+
+    calls = []
+    answer = {"text": "PASS first"}
+
+    class CountingLegacyClient:
+        class ChatCompletion:
+            @staticmethod
+            def create(model, messages, temperature):  # type: ignore[override]
+                calls.append(model)
+                return {"choices": [{"message": {"content": answer["text"]}}]}
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(gpt_audit, "_get_openai_client", lambda api_key: ("legacy", CountingLegacyClient))
+
+    def run(*flags: str) -> int:
+        calls.clear()
+        argv = ["gpt_audit.py", "--database", str(db_path), "--samples", "-1", "--no-dry-run", *flags]
+        monkeypatch.setattr(sys, "argv", argv)
+        gpt_audit.main()
+        return len(calls)
+
+    def cached_answers() -> set:
+        return {row[0] for row in conn.execute("SELECT answer FROM audit_cache")}
+
+    # --no-cache never touches audit_cache, even before the table exists.
+    assert run("--no-cache") == 2
+    assert conn.execute("SELECT COUNT(*) FROM supervisor_comments WHERE audit_status = 'PASS'").fetchone()[0] == 2
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'audit_cache'").fetchone() is None
+    assert run() == 2
+    assert run() == 0
+    answer["text"] = "FLAG second"
+    assert run("--no-cache") == 2
+    assert cached_answers() == {"PASS first"}
+    assert run("--refresh-cache") == 2
+    assert cached_answers() == {"FLAG second"}
+    assert run() == 0
+
+
 def test_interpret_response_flags_non_pass() -> None:
     assert interpret_response("PASS - looks good") == ("PASS", "")
     assert interpret_response("Needs work") == ("FLAG", "Needs work")
@@ -82,3 +156,82 @@ def test_send_prompt_legacy_returns_string() -> None:
     result = _send_prompt("legacy", DummyLegacyClient, "gpt-3.5-turbo", "prompt text")
     assert isinstance(result, str)
     assert result == "Looks consistent"
+
+
+def test_send_with_retry_backs_off_on_rate_limit(monkeypatch) -> None:
+    class RateLimited(Exception):
+        status_code = 429
+
+    calls = []
+
+    class FlakyLegacyClient:
+        class ChatCompletion:
+            @staticmethod
+            def create(model, messages, temperature):  # type: ignore[override]
+                calls.append(model)
+                if len(calls) < 3:
+                    raise RateLimited("slow down")
+                return {"choices": [{"message": {"content": "PASS"}}]}
+
+    sleeps = []
+    monkeypatch.setattr("gpt_audit.time.sleep", sleeps.append)
+    assert send_with_retry("legacy", FlakyLegacyClient, "gpt-test", "prompt", max_attempts=3) == "PASS"
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+
+    calls.clear()
+    with pytest.raises(RateLimited):
+        send_with_retry("legacy", FlakyLegacyClient, "gpt-test", "prompt", max_attempts=2)
+    assert len(calls) == 2
+
+
+def test_batch_requests_round_trip_by_comment_id() -> None:
+    samples = [(7, "2025-05-01", "a.xlsx", "Trenching"), (9, "2025-05-02", "b.xlsx", "Backfill")]
+    requests = [json.loads(line) for line in build_batch_requests(samples, "gpt-test").splitlines()]
+    assert [request["custom_id"] for request in requests] == ["7", "9"]
+    assert requests[0]["body"]["model"] == "gpt-test"
+    assert "Trenching" in requests[0]["body"]["messages"][0]["content"]
+
+    output = "\n".join(
+        [
+            json.dumps(
+                {
+                    "custom_id": "7",
+                    "response": {"status_code": 200, "body": {"choices": [{"message": {"content": " PASS "}}]}},
+                    "error": None,
+                }
+            ),
+            json.dumps({"custom_id": "9", "response": None, "error": {"message": "rate limited"}}),
+        ]
+    )
+    assert parse_batch_output(output) == {7: "PASS"}
+
+
+def test_main_batch_api_errors_are_counted_not_raised(tmp_path: Path, monkeypatch, capsys) -> None:
+    openai = pytest.importorskip("openai")
+    httpx = pytest.importorskip("httpx")
+    db_path = tmp_path / "audit.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE supervisor_comments (id INTEGER PRIMARY KEY, diary_date TEXT, source_file TEXT, comment TEXT)")
+    conn.executemany(
+        "INSERT INTO supervisor_comments (diary_date, source_file, comment) VALUES (?, ?, ?)",
+        [("2025-05-01", "a.xlsx", "Trenching"), ("2025-05-02", "b.xlsx", "Backfill")],
+    )
+    conn.commit()
+
+    class FailingUploadClient:
+        class files:
+            @staticmethod
+            def create(file, purpose):
+                raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/files"))
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(gpt_audit, "_get_openai_client", lambda api_key: ("chat_completions", FailingUploadClient))
+    monkeypatch.setattr(
+        sys, "argv", ["gpt_audit.py", "--database", str(db_path), "--samples", "-1", "--no-dry-run", "--batch"]
+    )
+
+    gpt_audit.main()
+
+    assert "audited 2, PASS 0, FLAG 0, errors 2" in capsys.readouterr().out
+    assert conn.execute("SELECT COUNT(*) FROM supervisor_comments WHERE audit_status IS NOT NULL").fetchone()[0] == 0
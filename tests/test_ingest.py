@@ -1,11 +1,16 @@
 import argparse
-import sqlite3
+import json
 import sys
+import zipfile
 from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
+from typing import Iterator, Tuple
+from uuid import uuid4
 
 import pytest
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
@@ -13,8 +18,23 @@ if str(ROOT) not in sys.path:
 
 import build_diary_database as bdb
 
+DIARY_DATE = datetime(2025, 10, 3)
+# What the workbooks below should ingest as.
+EXPECTED_ACTIVITY_ORDER = ["Formed entry ramp", "Placed rebar at sump"]
+EXPECTED_ACTIVITIES = frozenset(EXPECTED_ACTIVITY_ORDER)
+EXPECTED_PERSONNEL = frozenset({("John Doe", 8.0), ("Acme Crew", 10.0)})
+EXPECTED_COMMENTS = [("Worker One", "Trenching around pits")]
+EXPECTED_EXTENSIONS = [("Completed extra compaction",)]
 
+
+# Workbooks are built once per date and reused as bytes; openpyxl's XML/zip writer is the
+# slowest part of these tests.
 def _create_client_workbook(path: Path, diary_date: datetime) -> None:
+    path.write_bytes(_client_workbook_bytes(diary_date))
+
+
+@lru_cache(maxsize=None)
+def _client_workbook_bytes(diary_date: datetime) -> bytes:
     wb = Workbook()
     ws = wb.active
     ws.title = "001"
@@ -36,10 +56,24 @@ def _create_client_workbook(path: Path, diary_date: datetime) -> None:
     ws.append(["Formed entry ramp"])
     ws.append(["Placed rebar at sump"])
     ws.append(["PHOTOS"])
-    wb.save(path)
+    return _workbook_bytes(wb)
+
+
+def _create_client_workbook_with_undated_sheets(path: Path, diary_date: datetime) -> None:
+    wb = load_workbook(BytesIO(_client_workbook_bytes(diary_date)))
+    wb.create_sheet("Sheet2")
+    notes = wb.create_sheet("Notes")
+    notes.append(["Site notes"])
+    notes.append(["Nothing dated here"])
+    path.write_bytes(_workbook_bytes(wb))
 
 
 def _create_supervisor_workbook(path: Path, diary_date: datetime) -> None:
+    path.write_bytes(_supervisor_workbook_bytes(diary_date))
+
+
+@lru_cache(maxsize=None)
+def _supervisor_workbook_bytes(diary_date: datetime) -> bytes:
     wb = Workbook()
     ws = wb.active
     ws.title = "A"
@@ -52,12 +86,39 @@ def _create_supervisor_workbook(path: Path, diary_date: datetime) -> None:
     ws.append(["", "Daily Work Extension"])
     ws.append(["", "Completed extra compaction"])
     ws.append(["", "Daily Work Photos"])
-    wb.save(path)
+    return _workbook_bytes(wb)
+
+
+def _workbook_bytes(wb: Workbook) -> bytes:
+    buffer = BytesIO()
+    wb.save(buffer)
+    # Repack uncompressed: tests re-read these few-KB workbooks many times, and inflating
+    # them is wasted work.
+    stored = BytesIO()
+    with zipfile.ZipFile(buffer) as zin, zipfile.ZipFile(stored, "w", zipfile.ZIP_STORED) as zout:
+        for item in zin.infolist():
+            zout.writestr(item.filename, zin.read(item))
+    return stored.getvalue()
+
+
+def _memory_database() -> str:
+    # Shared-cache URI: every connection to it sees the same database while one stays open.
+    return f"file:diary_{uuid4().hex}?mode=memory&cache=shared"
+
+
+@pytest.fixture
+def memory_database() -> Iterator[Tuple[str, bdb.DiaryDatabase]]:
+    # Passed to run_ingest, so the follow-up queries reuse the ingest connection; holding it
+    # open also keeps the shared in-memory database alive.
+    uri = _memory_database()
+    db = bdb.DiaryDatabase(uri)
+    yield uri, db
+    db.close()
 
 
 def _make_args(
     root: Path,
-    db_path: Path,
+    db_path: str,
     *,
     use_supervisor: bool = False,
     use_client_fallback: bool = False,
@@ -77,21 +138,39 @@ def _make_args(
     )
 
 
-def test_ingest_with_supervisor_data(tmp_path: Path) -> None:
-    client_dir = tmp_path / "001-Client reports"
-    supervisor_dir = tmp_path / "002-Supervisor_Reports"
+# The report folders are only read by run_ingest, so each module builds them once and every
+# test writes its own in-memory database.
+@pytest.fixture(scope="module")
+def report_root(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    root = tmp_path_factory.mktemp("reports")
+    client_dir = root / "001-Client reports"
+    supervisor_dir = root / "002-Supervisor_Reports"
     client_dir.mkdir(parents=True)
     supervisor_dir.mkdir(parents=True)
-    _create_client_workbook(client_dir / "client.xlsx", datetime(2025, 10, 3))
-    _create_supervisor_workbook(supervisor_dir / "supervisor.xlsx", datetime(2025, 10, 3))
+    _create_client_workbook(client_dir / "client.xlsx", DIARY_DATE)
+    _create_supervisor_workbook(supervisor_dir / "supervisor.xlsx", DIARY_DATE)
+    return root
+
+
+@pytest.fixture(scope="module")
+def client_only_root(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    root = tmp_path_factory.mktemp("client_only")
+    client_dir = root / "001-Client reports"
+    client_dir.mkdir(parents=True)
+    _create_client_workbook(client_dir / "client.xlsx", DIARY_DATE)
+    return root
+
 
+def test_ingest_with_supervisor_data(report_root: Path, memory_database: Tuple[str, bdb.DiaryDatabase]) -> None:
+    db_uri, db = memory_database
+    conn = db.conn
     args = _make_args(
-        tmp_path,
-        tmp_path / "diary.sqlite",
+        report_root,
+        db_uri,
         use_supervisor=True,
         use_client_fallback=True,
     )
-    stats = bdb.run_ingest(args)
+    stats = bdb.run_ingest(args, db)
 
     assert stats["activities"] == 2
     assert stats["personnel"] == 2
@@ -99,98 +178,99 @@ def test_ingest_with_supervisor_data(tmp_path: Path) -> None:
     assert stats["supervisor_extension_notes"] == 1
     assert stats["fallback_activities"] == 0
 
-    conn = sqlite3.connect(args.database)
     activities = conn.execute("SELECT activity FROM activities").fetchall()
-    assert {row[0] for row in activities} == {"Formed entry ramp", "Placed rebar at sump"}
+    assert {row[0] for row in activities} == EXPECTED_ACTIVITIES
     personnel = conn.execute("SELECT name, hours FROM personnel").fetchall()
-    assert set(personnel) == {("John Doe", 8.0), ("Acme Crew", 10.0)}
+    assert set(personnel) == EXPECTED_PERSONNEL
     comments = conn.execute("SELECT worker_or_group, comment FROM supervisor_comments").fetchall()
-    assert comments == [("Worker One", "Trenching around pits")]
+    assert comments == EXPECTED_COMMENTS
     extensions = conn.execute("SELECT note FROM supervisor_extension_notes").fetchall()
-    assert extensions == [("Completed extra compaction",)]
+    assert extensions == EXPECTED_EXTENSIONS
     fallback_rows = conn.execute("SELECT COUNT(*) FROM client_fallback_activities").fetchone()[0]
     assert fallback_rows == 0
 
 
-def test_client_fallback_without_supervisor(tmp_path: Path) -> None:
-    client_dir = tmp_path / "001-Client reports"
-    client_dir.mkdir(parents=True)
-    _create_client_workbook(client_dir / "client.xlsx", datetime(2025, 10, 4))
-
-    args = _make_args(tmp_path, tmp_path / "diary.sqlite", use_client_fallback=True)
-    stats = bdb.run_ingest(args)
+def test_client_fallback_without_supervisor(
+    client_only_root: Path, memory_database: Tuple[str, bdb.DiaryDatabase]
+) -> None:
+    db_uri, db = memory_database
+    conn = db.conn
+    args = _make_args(client_only_root, db_uri, use_client_fallback=True)
+    stats = bdb.run_ingest(args, db)
 
     assert stats["fallback_activities"] == 2
 
-    conn = sqlite3.connect(args.database)
     fallback_rows = conn.execute("SELECT activity FROM client_fallback_activities").fetchall()
-    assert {row[0] for row in fallback_rows} == {"Formed entry ramp", "Placed rebar at sump"}
-
-
-def test_optional_sources_disabled_by_default(tmp_path: Path) -> None:
-    client_dir = tmp_path / "001-Client reports"
-    supervisor_dir = tmp_path / "002-Supervisor_Reports"
-    client_dir.mkdir(parents=True)
-    supervisor_dir.mkdir(parents=True)
-    _create_client_workbook(client_dir / "client.xlsx", datetime(2025, 10, 7))
-    _create_supervisor_workbook(supervisor_dir / "supervisor.xlsx", datetime(2025, 10, 7))
-
-    args = _make_args(tmp_path, tmp_path / "diary.sqlite")
-    stats = bdb.run_ingest(args)
+    assert {row[0] for row in fallback_rows} == EXPECTED_ACTIVITIES
+
+
+@pytest.mark.parametrize(
+    "flags",
+    [
+        pytest.param({}, id="disabled_by_default"),
+        pytest.param(
+            {
+                "use_supervisor": True,
+                "use_client_fallback": True,
+                "skip_supervisor": True,
+                "skip_client_fallback": True,
+            },
+            id="skip_flags_override",
+        ),
+    ],
+)
+def test_optional_sources_not_ingested(
+    report_root: Path, memory_database: Tuple[str, bdb.DiaryDatabase], flags: dict
+) -> None:
+    db_uri, db = memory_database
+    conn = db.conn
+    args = _make_args(report_root, db_uri, **flags)
+    stats = bdb.run_ingest(args, db)
 
     assert stats["supervisor_comments"] == 0
     assert stats["supervisor_extension_notes"] == 0
     assert stats["fallback_activities"] == 0
 
-    conn = sqlite3.connect(args.database)
     assert conn.execute("SELECT COUNT(*) FROM supervisor_comments").fetchone()[0] == 0
     assert conn.execute("SELECT COUNT(*) FROM client_fallback_activities").fetchone()[0] == 0
 
 
-def test_skip_flags_override_optional_sources(tmp_path: Path) -> None:
-    client_dir = tmp_path / "001-Client reports"
-    supervisor_dir = tmp_path / "002-Supervisor_Reports"
-    client_dir.mkdir(parents=True)
-    supervisor_dir.mkdir(parents=True)
-    _create_client_workbook(client_dir / "client.xlsx", datetime(2025, 10, 8))
-    _create_supervisor_workbook(supervisor_dir / "supervisor.xlsx", datetime(2025, 10, 8))
-
+def test_validate_only_success(report_root: Path, memory_database: Tuple[str, bdb.DiaryDatabase]) -> None:
+    db_uri, db = memory_database
     args = _make_args(
-        tmp_path,
-        tmp_path / "diary.sqlite",
+        report_root,
+        db_uri,
         use_supervisor=True,
         use_client_fallback=True,
-        skip_supervisor=True,
-        skip_client_fallback=True,
     )
     stats = bdb.run_ingest(args)
+    json.dumps(stats)  # plain counters only, no live handles
+    # Should not raise
+    bdb.run_validate(args.database)
+    # run_ingest closes only the connection it opened; the caller's stays usable.
+    assert db.conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 2
 
-    assert stats["supervisor_comments"] == 0
-    assert stats["supervisor_extension_notes"] == 0
-    assert stats["fallback_activities"] == 0
 
+def test_ingest_parses_before_opening_database(
+    report_root: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_path = tmp_path / "diary.sqlite"
+    parse_client_sheets = bdb.parse_client_sheets
 
-def test_validate_only_success(tmp_path: Path) -> None:
-    client_dir = tmp_path / "001-Client reports"
-    supervisor_dir = tmp_path / "002-Supervisor_Reports"
-    client_dir.mkdir(parents=True)
-    supervisor_dir.mkdir(parents=True)
-    _create_client_workbook(client_dir / "client.xlsx", datetime(2025, 10, 5))
-    _create_supervisor_workbook(supervisor_dir / "supervisor.xlsx", datetime(2025, 10, 5))
+    def parse_without_database(client_root: Path) -> list:
+        # Worker processes forked here must not inherit an open SQLite handle.
+        assert not db_path.exists()
+        return parse_client_sheets(client_root)
 
-    args = _make_args(
-        tmp_path,
-        tmp_path / "diary.sqlite",
-        use_supervisor=True,
-        use_client_fallback=True,
-    )
-    bdb.run_ingest(args)
-    # Should not raise
-    bdb.run_validate(args.database)
+    monkeypatch.setattr(bdb, "parse_client_sheets", parse_without_database)
+    stats = bdb.run_ingest(_make_args(report_root, str(db_path)))
 
+    assert stats["activities"] == 2
+    assert db_path.exists()
 
-def test_validate_only_reports_issues(tmp_path: Path) -> None:
-    db_path = tmp_path / "diary.sqlite"
+
+def test_validate_only_reports_issues() -> None:
+    db_path = _memory_database()
     db = bdb.DiaryDatabase(db_path, reset=False)
     db.insert_activity("2025-10-06", "Activity only", "manual.xlsx", "Sheet1")
     db.commit()
@@ -200,3 +280,190 @@ def test_validate_only_reports_issues(tmp_path: Path) -> None:
 
     message = str(excinfo.value)
     assert "2025-10-06" in message or "Missing supervisor and fallback coverage" in message
+
+
+def test_bulk_insert_counts_only_new_rows() -> None:
+    db = bdb.DiaryDatabase(_memory_database(), reset=True)
+    rows = [
+        ("2025-10-09", "Poured slab", "client.xlsx", "001"),
+        ("2025-10-09", "Poured slab", "client_copy.xlsx", "001"),
+        ("2025-10-09", "Stripped forms", "client.xlsx", "001"),
+    ]
+
+    inserted = db.bulk_insert("activities", bdb.ACTIVITY_COLUMNS, rows)
+    db.commit()
+
+    assert inserted == 2
+    assert db.bulk_insert("activities", bdb.ACTIVITY_COLUMNS, rows) == 0
+
+
+def test_ingest_skips_empty_and_undated_client_sheets(
+    tmp_path: Path, memory_database: Tuple[str, bdb.DiaryDatabase]
+) -> None:
+    client_dir = tmp_path / "001-Client reports"
+    client_dir.mkdir()
+    _create_client_workbook_with_undated_sheets(client_dir / "client.xlsx", DIARY_DATE)
+
+    sheets = bdb.parse_client_sheets(client_dir)
+    assert [sheet.worksheet for sheet in sheets] == ["001"]
+
+    db_uri, db = memory_database
+    conn = db.conn
+    stats = bdb.run_ingest(_make_args(tmp_path, db_uri), db)
+    assert stats["activities"] == 2
+    assert {row[0] for row in conn.execute("SELECT worksheet FROM activities")} == {"001"}
+
+
+def test_parse_client_sheets_across_multiple_files(tmp_path: Path) -> None:
+    client_dir = tmp_path / "001-Client reports"
+    client_dir.mkdir(parents=True)
+    _create_client_workbook(client_dir / "client_a.xlsx", DIARY_DATE)
+    _create_client_workbook(client_dir / "client_b.xlsx", datetime(2025, 10, 4))
+
+    sheets = bdb.parse_client_sheets(client_dir)
+
+    assert [Path(sheet.source_file).name for sheet in sheets] == ["client_a.xlsx", "client_b.xlsx"]
+    assert [sheet.diary_date.isoformat() for sheet in sheets] == ["2025-10-03", "2025-10-04"]
+    assert all(sheet.activities == EXPECTED_ACTIVITY_ORDER for sheet in sheets)
+
+
+@pytest.mark.skipif(not Path("/proc/self/fd").is_dir(), reason="needs /proc to list open files")
+@pytest.mark.parametrize("backend", ["calamine", "openpyxl"])
+def test_read_workbook_sheets_closes_workbook(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, backend: str) -> None:
+    if backend == "openpyxl":
+        monkeypatch.setattr(bdb, "CalamineWorkbook", None)
+    elif bdb.CalamineWorkbook is None:
+        pytest.skip("python-calamine is not installed")
+    workbook_path = tmp_path / "client.xlsx"
+    _create_client_workbook(workbook_path, DIARY_DATE)
+
+    sheets = bdb.read_workbook_sheets(workbook_path)
+
+    open_files = {str(path.resolve()) for path in Path("/proc/self/fd").iterdir() if path.exists()}
+    assert str(workbook_path.resolve()) not in open_files
+    assert [name for name, _ in sheets] == ["001"]
+    assert bdb.parse_client_rows(bdb.iter_value_rows(sheets[0][1])).activities == EXPECTED_ACTIVITY_ORDER
+
+
+def test_calamine_and_openpyxl_read_identical_rows(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    if bdb.CalamineWorkbook is None:
+        pytest.skip("python-calamine is not installed")
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Mixed"
+    ws.append(["Text", 8, 7.5, 1e20, 1.5e-7, True, False, DIARY_DATE, datetime(2025, 10, 3, 7, 30)])
+    ws.append([])
+    # No cached value for the formula: both backends must keep "after" in column C.
+    ws.append(["before", "=A1", "after", None, -3, 0.0, 1e15, "", "end"])
+    workbook_path = tmp_path / "mixed.xlsx"
+    workbook_path.write_bytes(_workbook_bytes(wb))
+
+    calamine_rows = bdb.read_workbook_sheets(workbook_path)
+    monkeypatch.setattr(bdb, "CalamineWorkbook", None)
+    openpyxl_rows = bdb.read_workbook_sheets(workbook_path)
+
+    assert calamine_rows == openpyxl_rows
+    # 1e20 == int(1e20), so compare the types as well.
+    assert [[list(map(type, row)) for row in rows] for _, rows in calamine_rows] == [
+        [list(map(type, row)) for row in rows] for _, rows in openpyxl_rows
+    ]
+
+
+def test_parse_date_from_string_layouts() -> None:
+    assert bdb._parse_date_from_string("2025-10-03 07:30:00") == datetime(2025, 10, 3).date()
+    assert bdb._parse_date_from_string("2025-10-03T07:30:00") == datetime(2025, 10, 3).date()
+    assert bdb._parse_date_from_string("3/10/25") == datetime(2025, 10, 3).date()
+    assert bdb._parse_date_from_string("03.10.1999") == datetime(1999, 10, 3).date()
+    assert bdb._parse_date_from_string("3 October 2025") == datetime(2025, 10, 3).date()
+    assert bdb._parse_date_from_string("Date: 03/10/2025") == datetime(2025, 10, 3).date()
+    assert bdb._parse_date_from_string("Formed entry ramp") is None
+
+
+@pytest.mark.parametrize(
+    "find_date",
+    [bdb.extract_diary_date, lambda rows: bdb.parse_client_rows(rows).diary_date],
+    ids=["extract_diary_date", "parse_client_rows"],
+)
+def test_diary_date_fallback_joins_rows_for_textual_months(find_date) -> None:
+    assert find_date(bdb.iter_value_rows([("3 October",), (2025,)])) == datetime(2025, 10, 3).date()
+    # A numeric date in any row still takes precedence over the joined text.
+    rows = bdb.iter_value_rows([("Shift report",), ("Date 4/10/2025",)])
+    assert find_date(rows) == datetime(2025, 10, 4).date()
+    assert find_date(bdb.iter_value_rows([("Site notes",), ("Nothing dated here",)])) is None
+    assert find_date(bdb.iter_value_rows([])) is None
+
+
+def test_bulk_load_defers_unique_indexes_on_empty_tables() -> None:
+    db = bdb.DiaryDatabase(_memory_database(), reset=True)
+    rows = [
+        ("2025-10-12", "Crew", "Jane Roe", "Operator", 8.0, "client.xlsx", "001"),
+        ("2025-10-12", "Crew", "Jane Roe", "Operator", 6.0, "client_copy.xlsx", "001"),
+    ]
+
+    with db.bulk_load():
+        assert "personnel" in db._deferred_keys
+        inserted = db.bulk_insert("personnel", bdb.PERSONNEL_COLUMNS, rows)
+    db.commit()
+
+    assert inserted == 1
+    indexes = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {index for index, _ in bdb.UNIQUE_INDEXES.values()} <= indexes
+    assert db.bulk_insert("personnel", bdb.PERSONNEL_COLUMNS, rows) == 0
+
+
+def test_delete_dates_only_removes_target_dates() -> None:
+    db = bdb.DiaryDatabase(_memory_database(), reset=True)
+    db.insert_activity("2025-10-13", "Keep me", "client.xlsx", "001")
+    db.insert_activity("2025-10-14", "Drop me", "client.xlsx", "001")
+    db.insert_person("2025-10-14", "Crew", "Jane Roe", "Operator", 8, "client.xlsx", "001")
+    db.commit()
+
+    db.delete_dates({"2025-10-14"})
+    db.commit()
+
+    assert db.conn.execute("SELECT activity FROM activities").fetchall() == [("Keep me",)]
+    assert db.conn.execute("SELECT COUNT(*) FROM personnel").fetchone()[0] == 0
+
+
+def test_transaction_rolls_back_on_error() -> None:
+    db = bdb.DiaryDatabase(_memory_database(), reset=True)
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.insert_activity("2025-10-15", "Never stored", "client.xlsx", "001")
+            raise RuntimeError("boom")
+
+    assert db.conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 0
+
+
+def test_reset_removes_wal_and_shm_files(tmp_path: Path) -> None:
+    db_path = tmp_path / "diary.sqlite"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").write_bytes(b"stale")
+
+    db = bdb.DiaryDatabase(db_path, reset=True)
+
+    assert db.conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 0
+    assert not Path(f"{db_path}-wal").exists()
+    assert not Path(f"{db_path}-shm").exists()
+
+
+def test_failed_bulk_load_restores_unique_indexes() -> None:
+    db = bdb.DiaryDatabase(_memory_database(), reset=True)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        with db.bulk_load():
+            # A writer bypassing bulk_insert gets duplicates past the dropped unique index.
+            for _ in range(2):
+                db.conn.execute(
+                    "INSERT INTO activities (diary_date, activity, source_file, worksheet) VALUES (?, ?, ?, ?)",
+                    ("2025-10-16", "Duplicate", "client.xlsx", "001"),
+                )
+            raise RuntimeError("boom")
+
+    assert db.conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 0
+    indexes = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {index for index, _ in bdb.UNIQUE_INDEXES.values()} <= indexes
+    db.insert_activity("2025-10-16", "Duplicate", "client.xlsx", "001")
+    db.insert_activity("2025-10-16", "Duplicate", "client.xlsx", "001")
+    assert db.conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 1
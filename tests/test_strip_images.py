@@ -0,0 +1,103 @@
+import sys
+import zipfile
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.chart import BarChart, Reference
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import strip_images
+
+# 1x1 transparent PNG; writing it by hand keeps Pillow out of the test dependencies.
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+PICTURE_ANCHOR = (
+    '<xdr:twoCellAnchor xmlns:xdr="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing">'
+    "<xdr:from><xdr:col>0</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>5</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from>"
+    "<xdr:to><xdr:col>2</xdr:col><xdr:colOff>0</xdr:colOff><xdr:row>9</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:to>"
+    "<xdr:pic><xdr:nvPicPr><xdr:cNvPr id='2' name='Picture 1'/><xdr:cNvPicPr/></xdr:nvPicPr>"
+    "<xdr:blipFill><a:blip r:embed='rIdImage1'/><a:stretch><a:fillRect/></a:stretch></xdr:blipFill>"
+    "<xdr:spPr><a:prstGeom prst='rect'><a:avLst/></a:prstGeom></xdr:spPr></xdr:pic>"
+    "<xdr:clientData/></xdr:twoCellAnchor>"
+)
+IMAGE_RELATIONSHIP = (
+    "<Relationship Id='rIdImage1' Target='../media/image1.png' "
+    "Type='http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'/>"
+)
+
+
+def _create_workbook_with_image_and_chart(path: Path) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Diary"
+    ws.append(["Activity", "Hours"])
+    ws.append(["Excavation", 6])
+    ws.append(["Backfill", 2.5])
+    chart = BarChart()
+    chart.add_data(Reference(ws, min_col=2, min_row=1, max_row=3), titles_from_data=True)
+    ws.add_chart(chart, "D2")
+    wb.save(path)
+
+    # openpyxl needs Pillow to add pictures, so add one to the chart's drawing directly,
+    # with single-quoted attributes and a relative target like other writers produce.
+    with zipfile.ZipFile(path) as zin:
+        members = {info.filename: zin.read(info) for info in zin.infolist()}
+    members["xl/drawings/drawing1.xml"] = members["xl/drawings/drawing1.xml"].replace(
+        b"</wsDr>", PICTURE_ANCHOR.encode() + b"</wsDr>"
+    )
+    members["xl/drawings/_rels/drawing1.xml.rels"] = members["xl/drawings/_rels/drawing1.xml.rels"].replace(
+        b"</Relationships>", IMAGE_RELATIONSHIP.encode() + b"</Relationships>"
+    )
+    members["[Content_Types].xml"] = members["[Content_Types].xml"].replace(
+        b"</Types>", b'<Default Extension="png" ContentType="image/png"/></Types>'
+    )
+    members["xl/media/image1.png"] = PNG_BYTES
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zout:
+        for name, data in members.items():
+            zout.writestr(name, data)
+
+
+def test_strip_images_keeps_cells_and_charts(tmp_path: Path) -> None:
+    source = tmp_path / "report.xlsx"
+    _create_workbook_with_image_and_chart(source)
+    original = source.read_bytes()
+
+    output = tmp_path / "report_stripped.xlsx"
+    new_size = strip_images.strip_images_from_excel(source, output, log=lambda line: None)
+
+    assert source.read_bytes() == original
+    assert new_size == strip_images.get_file_size_mb(output)
+    with zipfile.ZipFile(output) as zf:
+        names = zf.namelist()
+        drawing = zf.read("xl/drawings/drawing1.xml")
+        drawing_rels = zf.read("xl/drawings/_rels/drawing1.xml.rels")
+    assert "xl/media/image1.png" not in names
+    assert b"rIdImage1" not in drawing and b"rIdImage1" not in drawing_rels
+    assert b"chart" in drawing_rels
+
+    wb = load_workbook(output)
+    ws = wb["Diary"]
+    assert [list(row) for row in ws.iter_rows(values_only=True)] == [
+        ["Activity", "Hours"],
+        ["Excavation", 6],
+        ["Backfill", 2.5],
+    ]
+    assert len(ws._charts) == 1
+    assert ws._images == []
+
+
+def test_strip_images_overwrites_input_by_default(tmp_path: Path) -> None:
+    source = tmp_path / "report.xlsx"
+    _create_workbook_with_image_and_chart(source)
+
+    strip_images.strip_images_from_excel(source, log=lambda line: None)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["report.xlsx"]
+    with zipfile.ZipFile(source) as zf:
+        assert "xl/media/image1.png" not in zf.namelist()
+    assert len(load_workbook(source)["Diary"]._charts) == 1